@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from data.paths import CACHE_DIR
+
+ANALYSIS_CACHE_PATH = os.environ.get("ANALYSIS_CACHE_PATH", os.path.join(CACHE_DIR, "analysis_cache.sqlite3"))
+# Reports are evicted least-recently-used first once their total size exceeds this
+ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get("ANALYSIS_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+def _canonical(summary_data):
+    if hasattr(summary_data, "to_dict"):
+        summary_data = summary_data.to_dict()
+    return json.dumps(summary_data, sort_keys=True, default=str)
+
+def data_hash(summary_data):
+    """Content hash of one processed balance sheet."""
+    return hashlib.sha256(_canonical(summary_data).encode("utf-8")).hexdigest()
+
+def analysis_key(summary_data, target_date, prompt_version, model, trends=None, entity=None):
+    """
+    Cache key for an analysis: the balance sheet contents, the requested date,
+    the prompt version, the model, the trend metrics given to the prompt and
+    the entity the sheet belongs to.
+    """
+    parts = [data_hash(summary_data), str(target_date), str(prompt_version), model]
+    if trends is not None:
+        parts.append(data_hash(trends))
+    if entity is not None:
+        parts.append(f"entity:{entity}")
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+class AnalysisCache:
+    """
+    SQLite-backed store of generated analysis reports.
+
+    Entries are keyed by analysis_key, so a changed balance sheet simply misses;
+    storing a report also drops older reports for the same entity and sheet
+    date whose data hash differs. Total size is bounded with least-recently-used eviction.
+    """
+
+    def __init__(self, path=ANALYSIS_CACHE_PATH, max_bytes=ANALYSIS_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS analyses (
+                            key TEXT PRIMARY KEY,
+                            entity TEXT NOT NULL DEFAULT '',
+                            sheet_date TEXT NOT NULL,
+                            data_hash TEXT NOT NULL,
+                            content TEXT NOT NULL,
+                            size INTEGER NOT NULL,
+                            created_at REAL NOT NULL,
+                            last_access REAL NOT NULL
+                        )""")
+                    columns = [row[1] for row in conn.execute("PRAGMA table_info(analyses)")]
+                    if "entity" not in columns:
+                        # Caches created before reports were scoped by entity
+                        conn.execute("ALTER TABLE analyses ADD COLUMN entity TEXT NOT NULL DEFAULT ''")
+                    conn.execute("DROP INDEX IF EXISTS analyses_sheet_date")
+                    conn.execute("CREATE INDEX IF NOT EXISTS analyses_entity_sheet_date ON analyses (entity, sheet_date)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS analyses_last_access ON analyses (last_access)")
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    def get(self, key):
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT content FROM analyses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE analyses SET last_access = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                return row[0]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading analysis cache: {e}")
+            return None
+
+    def contains(self, key):
+        """Whether a report is cached for `key`, without counting as an access."""
+        try:
+            conn = self._connect()
+            try:
+                return conn.execute("SELECT 1 FROM analyses WHERE key = ?", (key,)).fetchone() is not None
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error reading analysis cache: {e}")
+            return False
+
+    def put(self, key, summary_data, content, entity=None):
+        # The unscoped data set is stored as the empty entity
+        entity = "" if entity is None else str(entity)
+        sheet_date = summary_data["date"]
+        digest = data_hash(summary_data)
+        size = len(content.encode("utf-8"))
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                # Reports for an older version of this entity's sheet can never be hit again
+                conn.execute("DELETE FROM analyses WHERE entity = ? AND sheet_date = ? AND data_hash != ?",
+                             (entity, sheet_date, digest))
+                conn.execute(
+                    "INSERT OR REPLACE INTO analyses (key, entity, sheet_date, data_hash, content, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, entity, sheet_date, digest, content, size, now, now)
+                )
+                self._evict(conn)
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Error writing analysis cache: {e}")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM analyses ORDER BY last_access ASC").fetchall():
+            conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+os.makedirs(os.path.dirname(ANALYSIS_CACHE_PATH) or ".", exist_ok=True)
+analysis_cache = AnalysisCache()
@@ -0,0 +1,203 @@
+import os
+import time
+import itertools
+import threading
+from collections import deque
+from agents.gpt_agent import MODEL, ANALYSIS_PROMPT_VERSION, build_analysis_prompt, analyze_balance_sheet
+from agents.analysis_cache import analysis_cache, analysis_key
+from data.context_packer import count_tokens
+from data.metrics import gauge
+from data.executor import ANALYSIS_PREGENERATE_WORKERS
+
+# Generate analyses in the background after each balance sheets refresh
+ANALYSIS_PREGENERATE = os.environ.get("ANALYSIS_PREGENERATE", "1") != "0"
+# Only the newest periods are pre-generated; older ones are still analysed on demand
+ANALYSIS_PREGENERATE_LIMIT = int(os.environ.get("ANALYSIS_PREGENERATE_LIMIT", "24"))
+# Share of the OpenAI rate limits the background jobs may use, per minute
+ANALYSIS_RPM = int(os.environ.get("ANALYSIS_RPM", "20"))
+ANALYSIS_TPM = int(os.environ.get("ANALYSIS_TPM", "40000"))
+# Completion length assumed when budgeting tokens before a call
+ANALYSIS_EXPECTED_OUTPUT_TOKENS = int(os.environ.get("ANALYSIS_EXPECTED_OUTPUT_TOKENS", "1200"))
+# Rate-limited (429) jobs are retried after an exponential backoff, up to the attempt limit
+ANALYSIS_RETRY_BACKOFF = float(os.environ.get("ANALYSIS_RETRY_BACKOFF", "30"))
+ANALYSIS_RETRY_BACKOFF_MAX = float(os.environ.get("ANALYSIS_RETRY_BACKOFF_MAX", "900"))
+ANALYSIS_MAX_ATTEMPTS = int(os.environ.get("ANALYSIS_MAX_ATTEMPTS", "5"))
+
+_WINDOW = 60.0
+
+def _is_rate_limited(error):
+    return getattr(error, "status_code", None) == 429
+
+class RateBudget:
+    """Sliding one-minute window over request and token counts."""
+
+    def __init__(self, rpm=ANALYSIS_RPM, tpm=ANALYSIS_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._calls = deque()
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def _trim(self, now):
+        while self._calls and now - self._calls[0][0] >= _WINDOW:
+            self._tokens -= self._calls.popleft()[1]
+
+    def wait(self, tokens):
+        """Seconds until a call using `tokens` fits the budget; records the call when that is 0."""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            # A single call larger than the token budget still gets through on an empty window
+            fits_tokens = self._tokens + tokens <= self.tpm or not self._calls
+            if len(self._calls) < self.rpm and fits_tokens:
+                self._calls.append((now, tokens))
+                self._tokens += tokens
+                return 0.0
+            return max(_WINDOW - (now - self._calls[0][0]), 0.05)
+
+    def usage(self):
+        with self._lock:
+            self._trim(time.monotonic())
+            return {"requests": len(self._calls), "tokens": self._tokens,
+                    "rpm_limit": self.rpm, "tpm_limit": self.tpm}
+
+class AnalysisScheduler:
+    """
+    Background queue that pre-generates AI analyses so viewers find them in
+    the analysis cache. Jobs run newest period first on a few worker threads,
+    under a requests- and tokens-per-minute budget. A 429 pauses the whole
+    queue and re-queues the job with exponential backoff.
+    """
+
+    def __init__(self, workers=ANALYSIS_PREGENERATE_WORKERS, budget=None):
+        self.workers = workers
+        self.budget = budget or RateBudget()
+        # (-sort_key, sequence, key) entries; the queue is short, so min() picks the next job
+        self._queue = []
+        self._queued = {}
+        self._running = set()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._paused_until = 0.0
+        self._completed = 0
+        self._failed = 0
+        self._rate_limited = 0
+
+    def enqueue(self, sheets, entity=None):
+        """
+        Queue analyses for `(sort_key, summary_data, target_date, trends)` items
+        of `entity` that are not cached yet. A larger sort_key runs first. Returns the number
+        of jobs added.
+        """
+        added = 0
+        with self._condition:
+            for sort_key, summary_data, target_date, trends in sheets:
+                key = analysis_key(summary_data, target_date, ANALYSIS_PROMPT_VERSION, MODEL, trends, entity)
+                if key in self._queued or key in self._running or analysis_cache.contains(key):
+                    continue
+                job = {"key": key, "summary_data": summary_data, "target_date": target_date, "trends": trends,
+                       "entity": entity,
+                       "sort_key": sort_key, "attempts": 0, "not_before": 0.0}
+                self._queued[key] = job
+                self._queue.append((-sort_key, next(self._sequence), key))
+                added += 1
+            if added:
+                self._start_workers()
+                self._condition.notify_all()
+        return added
+
+    def _start_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for i in range(len(self._threads), self.workers):
+            thread = threading.Thread(target=self._work, name=f"analysis-pregenerate-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                delay = self._paused_until - now
+                if delay <= 0 and self._queue:
+                    # Newest first, skipping jobs still in their retry backoff
+                    ready = [entry for entry in self._queue if self._queued[entry[2]]["not_before"] <= now]
+                    if ready:
+                        entry = min(ready)
+                        self._queue.remove(entry)
+                        job = self._queued.pop(entry[2])
+                        self._running.add(job["key"])
+                        return job
+                    delay = min(self._queued[entry[2]]["not_before"] for entry in self._queue) - now
+                if not self._queue:
+                    self._condition.wait()
+                else:
+                    self._condition.wait(timeout=max(delay, 0.05))
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            try:
+                self._run(job)
+            except Exception as e:
+                print(f"Error pre-generating analysis for {job['target_date']}: {e}")
+            finally:
+                with self._condition:
+                    self._running.discard(job["key"])
+
+    def _run(self, job):
+        if analysis_cache.contains(job["key"]):
+            # Someone viewed the period and generated it on demand meanwhile
+            return
+        prompt = build_analysis_prompt(job["summary_data"], job["target_date"], job["trends"])
+        tokens = count_tokens(prompt) + ANALYSIS_EXPECTED_OUTPUT_TOKENS
+        while True:
+            delay = self.budget.wait(tokens)
+            if not delay:
+                break
+            time.sleep(delay)
+
+        job["attempts"] += 1
+        try:
+            analyze_balance_sheet(job["summary_data"], job["target_date"], job["trends"], job["entity"])
+        except Exception as e:
+            if not _is_rate_limited(e) or job["attempts"] >= ANALYSIS_MAX_ATTEMPTS:
+                with self._condition:
+                    self._failed += 1
+                raise
+            self._retry_later(job)
+            return
+        with self._condition:
+            self._completed += 1
+
+    def _retry_later(self, job):
+        backoff = min(ANALYSIS_RETRY_BACKOFF * 2 ** (job["attempts"] - 1), ANALYSIS_RETRY_BACKOFF_MAX)
+        print(f"Analysis for {job['target_date']} was rate limited; retrying in {backoff:.0f}s")
+        with self._condition:
+            self._rate_limited += 1
+            # The limit is shared by every job, so hold the whole queue back
+            job["not_before"] = time.monotonic() + backoff
+            self._paused_until = max(self._paused_until, job["not_before"])
+            self._queued[job["key"]] = job
+            self._queue.append((-job["sort_key"], next(self._sequence), job["key"]))
+            self._condition.notify_all()
+
+    def status(self):
+        with self._condition:
+            pending = sorted(self._queue)
+            paused = self._paused_until - time.monotonic()
+            return {
+                "enabled": ANALYSIS_PREGENERATE,
+                "queued": len(self._queue),
+                "running": len(self._running),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rate_limited": self._rate_limited,
+                "paused_for_seconds": round(paused, 1) if paused > 0 else 0,
+                "next": [self._queued[entry[2]]["target_date"] for entry in pending[:10]],
+                "budget": self.budget.usage(),
+            }
+
+analysis_scheduler = AnalysisScheduler()
+
+gauge("analysis_queue_depth", "AI analyses waiting to be pre-generated.", lambda: len(analysis_scheduler._queue))
@@ -1,23 +1,73 @@
-import os
-import openai
-from dotenv import load_dotenv
-from openai import OpenAI
+from data.clients import complete, stream_completion
+from data.metrics import cache_event
 
-load_dotenv()
+MODEL = "gpt-4o"
+
+# Bump whenever the wording of the analysis prompt changes so cached reports are regenerated
+ANALYSIS_PROMPT_VERSION = 2
+
+def _trends_text(trends):
+    if not trends:
+        return ""
+    return (" Trends up to this date (growth rates as fractions against the periods about a quarter (qoq) "
+            f"and a year (yoy) earlier; rolling averages and volatilities over recent periods):{trends}.")
+
+def build_analysis_prompt(summary_data, target_date, trends=None):
+    return f"""Financial data and calculated ratios:{summary_data}.{_trends_text(trends)} Using the provided balance sheet data for the specified date, {target_date}, generate a concise financial analysis report evaluating the company's financial health. The report should be structured into the following six sections: 
+    1. Financial Summary: Provide an overview of the key financial figures, including total assets, liabilities, equity, and net income, highlighting any significant observations.
+    2. Breakdown of Financial Components: Analyze and describe the composition of assets, liabilities, and equity, noting any dominant or missing components.
+    3. Key Financial Ratios Interpretation: Evaluate the company's financial health by interpreting relevant ratios (e.g., current ratio, debt-to-equity ratio, return on equity, equity multiplier, debt ratio, and net profit margin) in the context of standard benchmarks.
+    4. Key Findings: Highlight the most critical takeaways from the data, such as liquidity, solvency, profitability, or significant trends.
+    5. Key Insights: Summarize actionable insights that can be drawn from the analysis, focusing on areas of strength, risks, or opportunities.
+    6. Recommendations: Provide practical recommendations for improving financial performance, mitigating risks, or leveraging opportunities.
+    Ensure that the analysis is clear, precise, and easy to understand, using the data provided to support conclusions where applicable."""
 
 def call_gpt_agent(prompt):
-    openai.api_key = os.getenv("OPENAI_API_KEY")
+    return complete(prompt, MODEL, "analysis")
+
+def stream_gpt_agent(prompt):
+    """Like call_gpt_agent, but yield the completion text piece by piece as it is generated."""
+    return stream_completion(prompt, MODEL, "analysis")
+
+def analyze_balance_sheet(summary_data, target_date, trends=None, entity=None):
+    """
+    Return the AI analysis for one balance sheet, reusing a cached report when
+    the same data, trends, prompt version and model have been analysed before.
+    `trends` are the period's metrics from data.trends, if available, and
+    `entity` the company the sheet belongs to.
+    """
+    from agents.analysis_cache import analysis_cache, analysis_key
+
+    key = analysis_key(summary_data, target_date, ANALYSIS_PROMPT_VERSION, MODEL, trends, entity)
+    summary = analysis_cache.get(key)
+    cache_event("analysis", "miss" if summary is None else "hit")
+    if summary is not None:
+        return summary
+
+    summary = call_gpt_agent(build_analysis_prompt(summary_data, target_date, trends))
+    if summary:
+        analysis_cache.put(key, summary_data, summary, entity)
+    return summary
+
+def stream_balance_sheet_analysis(summary_data, target_date, trends=None, entity=None):
+    """
+    Streaming counterpart of analyze_balance_sheet. A cached report is yielded
+    in one piece; otherwise tokens are forwarded as they arrive and the full
+    report is cached once the stream completes.
+    """
+    from agents.analysis_cache import analysis_cache, analysis_key
 
-    client = OpenAI(
-        api_key=os.environ.get("OPENAI_API_KEY"), 
-    )
+    key = analysis_key(summary_data, target_date, ANALYSIS_PROMPT_VERSION, MODEL, trends, entity)
+    summary = analysis_cache.get(key)
+    cache_event("analysis", "miss" if summary is None else "hit")
+    if summary is not None:
+        yield summary
+        return
 
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a helpful professional financial analyst."},
-            {"role": "user", "content": prompt}
-        ],
-        model="gpt-4o",
-    )
+    parts = []
+    for token in stream_gpt_agent(build_analysis_prompt(summary_data, target_date, trends)):
+        parts.append(token)
+        yield token
 
-    return chat_completion.choices[0].message.content
+    if parts:
+        analysis_cache.put(key, summary_data, "".join(parts), entity)
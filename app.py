@@ -1,79 +1,594 @@
-from flask import Flask, request, render_template, jsonify
-from data.fetch_data import fetch_data_from_supabase
-from data.processing import balance_briefing, financial_summary
-from data.markdown_generation import generate_markdown
-from data.chatbot import generate_response, load_data, get_relevant_tables
+from flask import Flask, request, render_template, jsonify, Response, stream_with_context, url_for, redirect, send_file, abort
+from data.fetch_data import fetch_data_from_supabase, sync_high_water_mark
+from data.processing import balance_briefing, financial_summary, merge_balance_sheets, DateIndex
+from data.balance_frame import BalanceSheetFrame, RECORD_FIELDS, FIELD_GROUPS, RATIO_NAMES
+from data.downsampling import lttb
+from data.trends import TrendAnalytics, TREND_NAMES
+from data.chart_renderer import chart_renderer, CHART_FORMATS
+from data.snapshot_store import save_snapshot, load_snapshot, snapshot_path
+from data.paths import CACHE_DIR
+from data.serialization import EncodedBodyCache
+from data.report_store import ReportStore
+from data.markdown_generation import generate_markdown, generate_html
+from data.executor import io_executor, ExecutorSaturated, MAX_CONCURRENT_REFRESHES
+from data.metrics import span, cache_event, gauge, request_duration, render as render_metrics
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from collections import OrderedDict
+from werkzeug.routing import BaseConverter
 import importlib
+import numpy as np
+import json
+import os
+import time
+import zlib
+import random
+import cProfile
+import threading
 from datetime import datetime, timedelta
 
 app = Flask(__name__)
 
-# Cache for balance sheets data
-_balance_sheets_cache = {
-    "data": None,
-    "timestamp": None
-}
+# Cached balance sheets per entity, least recently used first (see _new_entry)
+_balance_sheets_cache = OrderedDict()
 _CACHE_EXPIRY = timedelta(hours=3)  # Cache expires after 3 hours
+# Periodic full reload to pick up deleted periods that a delta sync cannot see
+_FULL_REFRESH_EXPIRY = timedelta(hours=24)
+# Past this age a stale snapshot is no longer served; requests wait for the refresh
+_MAX_STALENESS = timedelta(seconds=float(os.environ.get("BALANCE_SHEETS_MAX_STALENESS", str(24 * 3600))))
+# Failed refreshes are retried after an exponential backoff, capped at the maximum
+_REFRESH_BACKOFF = timedelta(seconds=float(os.environ.get("BALANCE_SHEETS_REFRESH_BACKOFF", "30")))
+_REFRESH_BACKOFF_MAX = timedelta(seconds=float(os.environ.get("BALANCE_SHEETS_REFRESH_BACKOFF_MAX", "1800")))
 
-def get_balance_sheets():
-    # Check if cache exists and is still valid
-    now = datetime.now()
-    if (_balance_sheets_cache["data"] is not None and 
-        _balance_sheets_cache["timestamp"] is not None and
-        now - _balance_sheets_cache["timestamp"] < _CACHE_EXPIRY):
-        print("Using cached balance sheets data")
-        return _balance_sheets_cache["data"]
-    
-    # Cache is empty or expired, fetch fresh data
-    print("Fetching fresh balance sheets data")
-    data = fetch_data_from_supabase()
-    balance_sheets = []
+# Entity served by the routes without an /entities/<entity> prefix; unset serves every row
+_DEFAULT_ENTITY = os.environ.get("BALANCE_SHEETS_DEFAULT_ENTITY") or None
+# Memory budget shared by all cached entities; past it the least recently used are dropped
+_CACHE_MAX_BYTES = int(os.environ.get("BALANCE_SHEETS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Charged per cached entity on top of its arrays, so entities without periods count too
+_ENTRY_OVERHEAD = 4096
+# Each entity's expiry is stretched by up to this fraction so tenants don't all refresh together
+_REFRESH_JITTER = float(os.environ.get("BALANCE_SHEETS_REFRESH_JITTER", "0.1"))
+# Comma-separated entity ids that may be served; when unset, any id with rows in Supabase is
+_KNOWN_ENTITIES = frozenset(entity.strip() for entity in os.environ.get("BALANCE_SHEETS_ENTITIES", "").split(",") if entity.strip())
+# Ids whose fetch returned no rows are answered with 404 for this long before Supabase is asked again
+_UNKNOWN_ENTITY_TTL = timedelta(seconds=float(os.environ.get("BALANCE_SHEETS_UNKNOWN_ENTITY_TTL", "600")))
+_UNKNOWN_ENTITIES_MAX = 4096
+
+# Upper bound for the `limit` parameter of /api/balance_sheets
+_MAX_PAGE_SIZE = int(os.environ.get("BALANCE_SHEETS_MAX_PAGE_SIZE", "1000"))
+# Chart series are downsampled to this many points unless the client asks for fewer
+_MAX_SERIES_POINTS = int(os.environ.get("BALANCE_SHEETS_MAX_SERIES_POINTS", "2000"))
+_SERIES_NAMES = ("total_asset", "total_liability", "total_equity", "net_income") + RATIO_NAMES
+
+# Render the un-highlighted chart in the background after each refresh (starts the render processes)
+_CHARTS_PRERENDER = os.environ.get("CHARTS_PRERENDER", "0") == "1"
+
+# Stats reports are rebuilt after a refresh only for entities whose reports were used this recently
+_REPORTS_KEEP_WARM = float(os.environ.get("REPORTS_KEEP_WARM", "3600"))
+
+# Persist each refreshed snapshot so a cold-started machine can serve it immediately
+_SNAPSHOT_ENABLED = os.environ.get("BALANCE_SHEETS_SNAPSHOT", "1") != "0"
+
+# Guards the entity map, the unknown ids and each entry's single-flight refresh state
+_cache_lock = threading.Lock()
+# Entity id -> time until which it is treated as unknown, oldest first
+_unknown_entities = OrderedDict()
+_refresh_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REFRESHES)
+
+# Kinds of encoded API bodies cached per entity, plain and gzipped
+_BODY_KINDS = ("balance_sheets", "series", "reports", "trends")
+
+class EntityConverter(BaseConverter):
+    """Entity ids in URLs; they also name the per-entity snapshot files."""
+    regex = r"[A-Za-z0-9_-]{1,64}"
+
+app.url_map.converters['entity'] = EntityConverter
+
+class UnknownEntity(LookupError):
+    """The entity has no balance sheets (or isn't in BALANCE_SHEETS_ENTITIES)."""
+
+def _new_entry(entity):
+    # Stable per-entity offset, so the spread survives restarts
+    jitter = zlib.crc32(str(entity).encode("utf-8")) % 1000 / 1000 * _REFRESH_JITTER
+    return {
+        "entity": entity,
+        "data": None,
+        "timestamp": None,
+        "full_timestamp": None,
+        "high_water_mark": None,
+        "date_index": None,
+        # Growth and rolling metrics, recomputed from the first changed period on each refresh
+        "trends": None,
+        # Content hash of the current data; doubles as the ETag of the balance sheet routes
+        "version": None,
+        # Memory of the snapshot arrays; reports and bodies are added in _entry_nbytes
+        "nbytes": _ENTRY_OVERHEAD,
+        # Stats reports of the current version and encoded API bodies, dropped with the entry
+        "reports": ReportStore(),
+        # Set while a background thread builds the reports, so views start at most one
+        "reports_building": False,
+        # Two versions, so requests still reading the previous one don't evict the current bodies
+        "bodies": {kind: EncodedBodyCache(f"{kind}_body", max_versions=2) for kind in _BODY_KINDS},
+        "expiry": _CACHE_EXPIRY * (1 + jitter),
+        # Set when a full fetch found no rows; the entry is then dropped instead of cached
+        "unknown": False,
+        # Single-flight state: at most one refresh per entity, everyone else waits on its event
+        "in_flight": None,
+        "failures": 0,
+        "retry_at": None
+    }
+
+def _resolve_entity(entity):
+    """Routes without an entity serve the default one."""
+    return _DEFAULT_ENTITY if entity is None else entity
+
+def _is_known(entity):
+    # Called with _cache_lock held
+    if entity == _DEFAULT_ENTITY:
+        return True
+    if _KNOWN_ENTITIES:
+        return entity in _KNOWN_ENTITIES
+    until = _unknown_entities.get(entity)
+    if until is None:
+        return True
+    if datetime.now() < until:
+        return False
+    del _unknown_entities[entity]
+    return True
+
+def _entry(entity=None):
+    """
+    The cache entry of `entity` (the default entity when None), marked as
+    most recently used. Entities not in memory start from their persisted
+    snapshot, if there is one. Raises UnknownEntity for ids that recently
+    had no rows.
+    """
+    entity = _resolve_entity(entity)
+    with _cache_lock:
+        entry = _balance_sheets_cache.get(entity)
+        if entry is not None:
+            _balance_sheets_cache.move_to_end(entity)
+            return entry
+        if not _is_known(entity):
+            raise UnknownEntity(entity)
+
+    # Loaded outside the lock; if another request got there first its entry wins
+    loaded = _new_entry(entity)
+    _warm_start(loaded)
+    with _cache_lock:
+        entry = _balance_sheets_cache.setdefault(entity, loaded)
+    # Entries still waiting for their first fetch don't push out tenants with data
+    if entry is loaded and loaded["data"] is not None:
+        _enforce_budget(entity)
+    return entry
+
+def _forget_entity(entry):
+    """Drop an entity whose full fetch returned no rows, along with any snapshot it left behind."""
+    entity = entry["entity"]
+    with _cache_lock:
+        if _balance_sheets_cache.get(entity) is entry:
+            del _balance_sheets_cache[entity]
+        _unknown_entities[entity] = datetime.now() + _UNKNOWN_ENTITY_TTL
+        _unknown_entities.move_to_end(entity)
+        while len(_unknown_entities) > _UNKNOWN_ENTITIES_MAX:
+            _unknown_entities.popitem(last=False)
+    try:
+        os.remove(snapshot_path(entity))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error removing balance sheets snapshot: {e}")
+    print(f"No balance sheets found for entity {entity}")
+
+def _entry_nbytes(entry):
+    """Memory charged against _CACHE_MAX_BYTES: snapshot arrays, stats reports and encoded bodies."""
+    return entry["nbytes"] + entry["reports"].nbytes + sum(cache.nbytes for cache in entry["bodies"].values())
+
+def _enforce_budget(keep):
+    """Drop least recently used entities until the cache fits in _CACHE_MAX_BYTES."""
+    evicted = []
+    with _cache_lock:
+        total = sum(_entry_nbytes(entry) for entry in _balance_sheets_cache.values())
+        for entity, entry in list(_balance_sheets_cache.items()):
+            if total <= _CACHE_MAX_BYTES:
+                break
+            # Entities being refreshed are kept; their refresh would re-add them anyway
+            if entity == keep or entry["in_flight"] is not None:
+                continue
+            del _balance_sheets_cache[entity]
+            total -= _entry_nbytes(entry)
+            evicted.append(entity)
+    for entity in evicted:
+        cache_event("balance_sheets", "evict")
+        print(f"Evicted balance sheets of entity {entity} from memory")
+
+def _set_snapshot(entry, balance_sheets, date_index, timestamp):
+    trends = TrendAnalytics(date_index, previous=entry["trends"])
+    # Readers check the timestamp of whatever data they see, so it has to be in place first
+    entry["timestamp"] = timestamp
+    entry["trends"] = trends
+    entry["date_index"] = date_index
+    entry["data"] = balance_sheets
+    entry["version"] = balance_sheets.fingerprint()
+    entry["nbytes"] = balance_sheets.nbytes + date_index.nbytes + trends.nbytes + _ENTRY_OVERHEAD
+
+def _full_refresh(entry, now):
+    print(f"Fetching fresh balance sheets data{_entity_suffix(entry)}")
+    data = fetch_data_from_supabase(entity=entry["entity"])
+    if data is None:
+        return False
     
-    if data:
-        data_accounting_balance_sheets = data.get("accounting_balance_sheets")
-        balance_sheets = balance_briefing(data_accounting_balance_sheets)
+    data_accounting_balance_sheets = data.get("accounting_balance_sheets") or []
+    if not data_accounting_balance_sheets and entry["entity"] != _DEFAULT_ENTITY:
+        entry["unknown"] = True
+        return True
+    balance_sheets = balance_briefing(data_accounting_balance_sheets)
+    high_water_mark = sync_high_water_mark(data_accounting_balance_sheets)
         
     try:
-        balance_sheets.sort(key=lambda x: datetime.fromisoformat(x['date']))
-    except (KeyError, ValueError) as e:
+        balance_sheets = balance_sheets.sort_by_date()
+    except (TypeError, ValueError) as e:
         print(f"Error sorting balance sheets: {e}")
     
-    # Update cache
-    _balance_sheets_cache["data"] = balance_sheets
-    _balance_sheets_cache["timestamp"] = now
-        
-    return balance_sheets
+    entry["full_timestamp"] = now
+    _set_snapshot(entry, balance_sheets, DateIndex(balance_sheets), now)
+    entry["high_water_mark"] = high_water_mark
+    return True
+
+def _incremental_refresh(entry, now):
+    high_water_mark = entry["high_water_mark"]
+    print(f"Syncing balance sheets changed since {high_water_mark}{_entity_suffix(entry)}")
+    data = fetch_data_from_supabase(since=high_water_mark, entity=entry["entity"])
+    if data is None:
+        return False
+    
+    rows = data.get("accounting_balance_sheets") or []
+    try:
+        balance_sheets = merge_balance_sheets(entry["data"], balance_briefing(rows))
+    except (TypeError, ValueError) as e:
+        print(f"Error merging balance sheets: {e}")
+        return _full_refresh(entry, now)
+    
+    _set_snapshot(entry, balance_sheets, DateIndex(balance_sheets, previous=entry["date_index"]), now)
+    entry["high_water_mark"] = sync_high_water_mark(rows, high_water_mark)
+    return True
+
+def _entity_suffix(entry):
+    return f" for entity {entry['entity']}" if entry["entity"] is not None else ""
+
+def _persist_snapshot(entry):
+    if not _SNAPSHOT_ENABLED:
+        return
+    try:
+        with span("snapshot_save"):
+            save_snapshot(entry["data"], entry["date_index"], {
+                "timestamp": entry["timestamp"].isoformat(),
+                "full_timestamp": entry["full_timestamp"].isoformat(),
+                "high_water_mark": entry["high_water_mark"]
+            }, snapshot_path(entry["entity"]))
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Error saving balance sheets snapshot: {e}")
+
+def _warm_start(entry):
+    """Load the entity's last persisted snapshot so its first request doesn't wait on Supabase."""
+    if not _SNAPSHOT_ENABLED:
+        return
+    try:
+        with span("snapshot_load"):
+            snapshot = load_snapshot(snapshot_path(entry["entity"]))
+    except (OSError, KeyError, TypeError, ValueError) as e:
+        print(f"Error loading balance sheets snapshot: {e}")
+        return
+    if snapshot is None:
+        return
+
+    frame, keys, positions, meta = snapshot
+    entry["full_timestamp"] = datetime.fromisoformat(meta["full_timestamp"])
+    _set_snapshot(entry, frame, DateIndex.from_arrays(frame, keys, positions), datetime.fromisoformat(meta["timestamp"]))
+    entry["high_water_mark"] = meta["high_water_mark"]
+    print(f"Loaded balance sheets snapshot from {meta['timestamp']} ({len(frame)} periods){_entity_suffix(entry)}")
+
+def _materialize_reports(entry):
+    # Done off the request path so date selection on / stays a lookup
+    try:
+        entry["reports"].materialize(entry["data"], entry["version"])
+    except Exception as e:
+        print(f"Error building stats reports: {e}")
+
+def _start_reports_build(entry):
+    """Build the entity's stats reports in the background unless that is already under way."""
+    with _cache_lock:
+        if entry["reports_building"]:
+            return
+        entry["reports_building"] = True
+    threading.Thread(target=_build_reports, args=(entry,), name="reports-materialize", daemon=True).start()
+
+def _build_reports(entry):
+    try:
+        # Shares the refresh slots, so report batches can't crowd out the CPU
+        with _refresh_slots:
+            _materialize_reports(entry)
+    finally:
+        with _cache_lock:
+            entry["reports_building"] = False
+    _enforce_budget(entry["entity"])
+
+def _schedule_analyses(entry):
+    """Queue AI analyses for the newest periods that aren't cached yet."""
+    scheduler = importlib.import_module("agents.analysis_scheduler")
+    if not scheduler.ANALYSIS_PREGENERATE:
+        return
+    try:
+        date_index = entry["date_index"]
+        trends = entry["trends"]
+        balance_sheets = date_index.sheets
+        count = len(date_index)
+        newest = range(count - 1, max(count - scheduler.ANALYSIS_PREGENERATE_LIMIT, 0) - 1, -1)
+        sheets = []
+        for i in newest:
+            sheet = balance_sheets[int(date_index.positions[i])]
+            sheets.append((i, sheet, sheet['date'], trends.at(i)))
+        added = scheduler.analysis_scheduler.enqueue(sheets, entry["entity"])
+        if added:
+            print(f"Queued {added} AI analyses for background generation")
+    except Exception as e:
+        print(f"Error queueing AI analyses: {e}")
+
+def _prerender_chart(entry):
+    try:
+        chart_renderer.submit(entry["data"], entry["version"])
+    except Exception as e:
+        print(f"Error starting chart render: {e}")
+
+def _claim_refresh(entry):
+    """
+    Elect a refresh leader for the entry; call with `_cache_lock` held.
+    Returns the in-flight completion event and whether the caller claimed it.
+    """
+    done = entry["in_flight"]
+    if done is not None:
+        return done, False
+    done = threading.Event()
+    entry["in_flight"] = done
+    return done, True
+
+def _start_background_refresh(entry):
+    """Start a refresh thread for the entry unless one is already running. Returns its completion event."""
+    with _cache_lock:
+        done, leader = _claim_refresh(entry)
+    if leader:
+        threading.Thread(target=_refresh_balance_sheets, args=(entry, done), name="balance-sheets-refresh", daemon=True).start()
+    return done
+
+def _refresh_balance_sheets(entry, done):
+    # Entities refresh independently, but only a few at a time
+    with _refresh_slots:
+        now = datetime.now()
+        try:
+            # Pull only new or changed rows when a recent full load exists
+            if (entry["data"] and
+                entry["high_water_mark"] is not None and
+                now - entry["full_timestamp"] < _FULL_REFRESH_EXPIRY):
+                with span("balance_sheets_refresh", mode="incremental"):
+                    ok = _incremental_refresh(entry, now)
+            else:
+                with span("balance_sheets_refresh", mode="full"):
+                    ok = _full_refresh(entry, now)
+        except Exception as e:
+            print(f"Error refreshing balance sheets: {e}")
+            ok = False
+
+    if ok and entry["unknown"]:
+        _forget_entity(entry)
+
+    with _cache_lock:
+        if ok:
+            entry["failures"] = 0
+            entry["retry_at"] = None
+        else:
+            entry["failures"] += 1
+            backoff = min(_REFRESH_BACKOFF * 2 ** (entry["failures"] - 1), _REFRESH_BACKOFF_MAX)
+            entry["retry_at"] = datetime.now() + backoff
+            print(f"Balance sheets refresh failed{_entity_suffix(entry)}; retrying in {backoff.total_seconds():.0f}s")
+        entry["in_flight"] = None
+    done.set()
+    if ok and not entry["unknown"]:
+        _enforce_budget(entry["entity"])
+        # The new snapshot is already being served; the rest must not hold up the requests that waited on it
+        threading.Thread(target=_after_refresh, args=(entry,), name="balance-sheets-publish", daemon=True).start()
+
+def _after_refresh(entry):
+    """Persist, report and queue work for a freshly published snapshot."""
+    with _refresh_slots:
+        _persist_snapshot(entry)
+        # Reports are several times the size of the snapshot; only keep them for entities in use
+        if entry["reports"].used_within(_REPORTS_KEEP_WARM):
+            _materialize_reports(entry)
+        else:
+            entry["reports"].clear()
+        _schedule_analyses(entry)
+        if _CHARTS_PRERENDER:
+            _prerender_chart(entry)
+    _enforce_budget(entry["entity"])
+
+def get_balance_sheets(entity=None):
+    """
+    Return the processed balance sheets of `entity` (the default entity when
+    None), serving a stale snapshot while a single background refresh runs.
+    Callers only block when there is no snapshot yet or it is older than the
+    hard staleness limit, and then all of them wait on the same in-flight fetch.
+    """
+    entry = _entry(entity)
+    now = datetime.now()
+    data = entry["data"]
+    timestamp = entry["timestamp"]
+
+    # Check if cache exists and is still valid
+    if data is not None and timestamp is not None and now - timestamp < entry["expiry"]:
+        cache_event("balance_sheets", "hit")
+        return data
+
+    usable = data is not None and timestamp is not None and now - timestamp < _MAX_STALENESS
+    with _cache_lock:
+        done = entry["in_flight"]
+        backing_off = entry["retry_at"] is not None and now < entry["retry_at"]
+        if backing_off and done is None:
+            # Last refresh failed recently; don't hit Supabase again yet
+            cache_event("balance_sheets", "stale")
+            return data if data is not None else BalanceSheetFrame.empty()
+
+        if not usable:
+            done, leader = _claim_refresh(entry)
+
+    if usable:
+        _start_background_refresh(entry)
+        cache_event("balance_sheets", "stale")
+        return data
+
+    cache_event("balance_sheets", "miss")
+
+    if leader:
+        _refresh_balance_sheets(entry, done)
+    else:
+        done.wait()
+
+    if entry["unknown"]:
+        raise UnknownEntity(entry["entity"])
+    data = entry["data"]
+    return data if data is not None else BalanceSheetFrame.empty()
 
-# Function removed/commented out
-# def get_plot(balance_sheets):
-#     return plot_financial_briefing(balance_sheets)
+def get_date_index(entity=None):
+    """Return the date index built alongside the entity's current balance sheets snapshot."""
+    balance_sheets = get_balance_sheets(entity)
+    date_index = _entry(entity)["date_index"]
+    # A refresh may have swapped the snapshot in the meantime; the index always
+    # carries the sheets it was built from, so callers should read those
+    if date_index is None:
+        date_index = DateIndex(balance_sheets)
+    return date_index
+
+def get_trends(entity=None):
+    """Return the trend analytics of the entity's current snapshot; `.date_index` is the index they cover."""
+    date_index = get_date_index(entity)
+    trends = _entry(entity)["trends"]
+    if trends is None or trends.date_index is not date_index:
+        trends = TrendAnalytics(date_index)
+    return trends
+
+_default_entry = _entry(_DEFAULT_ENTITY)
+if _default_entry["timestamp"] is not None and datetime.now() - _default_entry["timestamp"] >= _default_entry["expiry"]:
+    _start_background_refresh(_default_entry)
+
+# Fraction of requests profiled with cProfile (0 disables); stats are written to PROFILE_DIR
+_PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+_PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
+# Only one profiler can be active at a time
+_profile_lock = threading.Lock()
+
+def _cached_entries():
+    with _cache_lock:
+        return list(_balance_sheets_cache.values())
+
+gauge("balance_sheets_entities", "Entities whose balance sheets are held in memory.",
+      lambda: len(_balance_sheets_cache))
+gauge("balance_sheets_cache_bytes", "Memory charged against the balance sheets cache budget.",
+      lambda: sum(_entry_nbytes(entry) for entry in _cached_entries()))
+gauge("balance_sheets_periods", "Periods held in memory across all entities.",
+      lambda: sum(len(entry["data"]) for entry in _cached_entries() if entry["data"] is not None))
+gauge("balance_sheets_max_age_seconds", "Age of the oldest balance sheets snapshot held in memory.",
+      lambda: max([(datetime.now() - entry["timestamp"]).total_seconds()
+                   for entry in _cached_entries() if entry["timestamp"] is not None], default=0))
+
+@app.before_request
+def _start_request_timer():
+    request.environ["reflash.start"] = time.perf_counter()
+    if _PROFILE_SAMPLE_RATE and random.random() < _PROFILE_SAMPLE_RATE and _profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        request.environ["reflash.profiler"] = profiler
+        profiler.enable()
+
+@app.after_request
+def _record_request(response):
+    start = request.environ.get("reflash.start")
+    if start is not None:
+        request_duration.observe(time.perf_counter() - start, endpoint=request.endpoint or "unmatched",
+                                 method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def _finish_profile(error=None):
+    profiler = request.environ.pop("reflash.profiler", None)
+    if profiler is None:
+        return
+    profiler.disable()
+    try:
+        os.makedirs(_PROFILE_DIR, exist_ok=True)
+        name = f"{request.endpoint or 'unmatched'}-{datetime.now():%Y%m%dT%H%M%S%f}.prof"
+        profiler.dump_stats(os.path.join(_PROFILE_DIR, name))
+    except OSError as e:
+        print(f"Error writing request profile: {e}")
+    finally:
+        _profile_lock.release()
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Counters, stage timings and gauges in the Prometheus text format."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+def _wants_stream():
+    return request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', '')
+
+def _event_stream(chunks):
+    """Wrap text chunks as server-sent events, ending with a `done` event."""
+    try:
+        for chunk in chunks:
+            yield f"data: {json.dumps({'token': chunk})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        print(f"Error while streaming response: {e}")
+        yield f"event: error\ndata: {json.dumps({'error': 'Streaming failed'})}\n\n"
+
+def _sse_response(chunks):
+    # X-Accel-Buffering stops reverse proxies from holding back the events
+    return Response(stream_with_context(_event_stream(chunks)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/', methods=['GET', 'POST'])
-def home():
+@app.route('/entities/<entity:entity>/', methods=['GET', 'POST'])
+def home(entity=None):
     summary = None
     stats = None
+    stats_html = None
     target_date = None
-    # We'll no longer generate a backend plot
-    plot = None
+    # Server-rendered charts are linked, not inlined; the image is rendered when first requested
+    plot_url = None
     
     # Get balance sheets
-    balance_sheets = get_balance_sheets()
+    date_index = get_date_index(entity)
+    balance_sheets = date_index.sheets
     
     # Extract available dates for the dropdown
-    available_dates = sorted([sheet['date'] for sheet in balance_sheets], reverse=True)
+    available_dates = sorted(balance_sheets.dates, reverse=True)
     
     if request.method == 'POST':
         target_date = request.form.get('target_date')
         
         if target_date and balance_sheets:
             # Get financial summary for the target date
-            summary_data = financial_summary(balance_sheets, target_date)
+            summary_data = financial_summary(balance_sheets, target_date, date_index)
             
-            # Generate markdown for display
-            stats = generate_markdown(summary_data)
+            # Stats reports are built for every period of the entities in use
+            version = _data_version(entity, balance_sheets)
+            entry = _entry(entity)
+            stats = entry["reports"].lookup(version, summary_data['date'])
+            stats_html = entry["reports"].lookup(version, summary_data['date'], 'html')
+            if stats is None or stats_html is None:
+                # Not built yet (first view since boot or since it went idle); render just this period
+                stats = generate_markdown(summary_data)
+                stats_html = generate_html(summary_data)
+                _start_reports_build(entry)
             
-            # Plot generation removed
-            # plot = get_plot(balance_sheets)
+            plot_url = _chart_url(entity, version, summary_data['date'], 'png')
             
             # We'll no longer create the summary here - it will be loaded async
             summary = "Loading analysis..."
@@ -81,49 +596,352 @@ def home():
     return render_template('template.html', 
                           summary=summary, 
                           stats=stats, 
+                          stats_html=stats_html, 
                           target_date=target_date, 
-                          plot_url=None,  # Always passing None for plot_url
-                          balance_sheets=balance_sheets, 
-                          available_dates=available_dates)
+                          plot_url=plot_url,
+                          has_balance_sheets=len(balance_sheets) > 0, 
+                          available_dates=available_dates,
+                          entity=entity)
+
+def _parse_fields(spec):
+    """Turn a comma-separated `fields` parameter into a set of record keys."""
+    fields = set()
+    for name in spec.split(','):
+        name = name.strip()
+        if not name:
+            continue
+        if name in FIELD_GROUPS:
+            fields.update(FIELD_GROUPS[name])
+        elif name in RECORD_FIELDS:
+            fields.add(name)
+        else:
+            raise ValueError(f"Unknown field: {name}")
+    return fields
+
+def _parse_limit(value):
+    limit = int(value)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, _MAX_PAGE_SIZE)
 
 # Add an API endpoint to get balance sheet data as JSON if needed
 @app.route('/api/balance_sheets', methods=['GET'])
-def get_balance_sheets_api():
-    balance_sheets = get_balance_sheets()
-    return jsonify(balance_sheets)
+@app.route('/api/entities/<entity:entity>/balance_sheets', methods=['GET'])
+def get_balance_sheets_api(entity=None):
+    """
+    Balance sheets as JSON, oldest first. Optional parameters:
+    `from`/`to` (inclusive date range), `fields` (record keys or the
+    "totals"/"breakdowns" groups; "date" is always included), `limit` and
+    `cursor` (page size, and the X-Next-Cursor value of the previous page).
+    """
+    date_index = get_date_index(entity)
+    balance_sheets = date_index.sheets
+    version, headers, not_modified = _revalidate(entity, balance_sheets)
+    if not_modified is not None:
+        return not_modified
+
+    args = request.args
+    try:
+        fields = _parse_fields(args['fields']) if 'fields' in args else None
+        limit = _parse_limit(args['limit']) if 'limit' in args else None
+        lo, hi = date_index.span(args.get('from'), args.get('to'), after=args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+
+    if limit is not None and hi - lo > limit:
+        hi = lo + limit
+        next_cursor = date_index.cursor(hi)
+        headers["X-Next-Cursor"] = next_cursor
+        next_url = url_for('get_balance_sheets_api', **{**args.to_dict(), 'cursor': next_cursor, 'entity': entity})
+        headers["Link"] = f'<{next_url}>; rel="next"'
+
+    if fields is None and lo == 0 and hi == len(date_index):
+        # Whole history: serialize the frame as is
+        variant = None
+        build = balance_sheets.to_records
+    else:
+        # Only the selected periods and columns are materialized
+        variant = (lo, hi, tuple(sorted(fields)) if fields is not None else None)
+        selected = date_index.positions[lo:hi]
+        build = lambda: balance_sheets.take(selected).to_records(fields)
+
+    return _encoded_response(entity, "balance_sheets", version, variant, build, headers)
+
+@app.route('/api/balance_sheets/series', methods=['GET'])
+@app.route('/api/entities/<entity:entity>/balance_sheets/series', methods=['GET'])
+def get_balance_sheet_series(entity=None):
+    """
+    Chart series as `{"series": {name: {"dates": [...], "values": [...]}}}`.
+    Parameters: `series` (comma-separated totals and ratio names, default all),
+    `from`/`to`, `points` (target point count per series; longer series are
+    downsampled with LTTB) and `highlight` (a date that is always kept).
+    """
+    date_index = get_date_index(entity)
+    balance_sheets = date_index.sheets
+    version, headers, not_modified = _revalidate(entity, balance_sheets)
+    if not_modified is not None:
+        return not_modified
+
+    args = request.args
+    try:
+        names = [name.strip() for name in args.get('series', ','.join(_SERIES_NAMES)).split(',') if name.strip()]
+        unknown = [name for name in names if name not in _SERIES_NAMES]
+        if unknown:
+            raise ValueError(f"Unknown series: {', '.join(unknown)}")
+        points = min(int(args.get('points', _MAX_SERIES_POINTS)), _MAX_SERIES_POINTS)
+        if points < 3:
+            raise ValueError("points must be at least 3")
+        lo, hi = date_index.span(args.get('from'), args.get('to'))
+        highlight = args.get('highlight')
+        if highlight is not None:
+            highlight = date_index.span(highlight, highlight)[0]
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+
+    variant = (tuple(names), lo, hi, points, highlight)
+    build = lambda: {"series": _build_series(date_index, names, lo, hi, points, highlight)}
+    return _encoded_response(entity, "series", version, variant, build, headers)
+
+def _build_series(date_index, names, lo, hi, points, highlight):
+    balance_sheets = date_index.sheets
+    selected = date_index.positions[lo:hi]
+    x = date_index.keys[lo:hi].view(np.int64)
+    series = {}
+    for name in names:
+        column = balance_sheets.ratios[name] if name in RATIO_NAMES else getattr(balance_sheets, name)
+        y = column[selected]
+        if len(y) > points:
+            # Gaps can't be downsampled; drop them before picking points
+            finite = np.flatnonzero(np.isfinite(y))
+            keep = finite[lttb(x[finite], y[finite], points)]
+            if highlight is not None and lo <= highlight < hi and np.isfinite(y[highlight - lo]):
+                keep = np.union1d(keep, [highlight - lo])
+        else:
+            keep = np.arange(len(y))
+        series[name] = {
+            "dates": [balance_sheets.dates[i] for i in selected[keep].tolist()],
+            "values": [None if value != value else value for value in y[keep].tolist()]
+        }
+    return series
+
+def _data_version(entity, balance_sheets):
+    entry = _entry(entity)
+    version = entry["version"]
+    if version is None or entry["data"] is not balance_sheets:
+        # Nothing cached yet (empty fallback) or a refresh swapped the data mid-request
+        version = balance_sheets.fingerprint()
+    return version
+
+def _response_encoding():
+    return "gzip" if "gzip" in request.accept_encodings else "identity"
+
+def _revalidate(entity, balance_sheets):
+    # Caching headers for the current data version, plus a 304 if the client already has it
+    version = _data_version(entity, balance_sheets)
+    # Each encoding is its own representation, so the gzipped body gets its own ETag
+    etag = f"{version}-gz" if _response_encoding() == "gzip" else version
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag in request.if_none_match:
+        return version, headers, Response(status=304, headers=headers)
+    return version, headers, None
+
+def _encoded_response(entity, kind, version, variant, build, headers):
+    # Serialize once per data version and view; later requests reuse the encoded bytes
+    encoding = _response_encoding()
+    entry = _entry(entity)
+    cache = entry["bodies"][kind]
+    cached = cache.nbytes
+    body = cache.get(version, variant, encoding, build)
+    if cache.nbytes > cached:
+        # New bodies count against the memory budget like the snapshots do
+        _enforce_budget(entry["entity"])
+    if encoding == "gzip":
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, mimetype="application/json", headers=headers)
+
+@app.route('/api/reports', methods=['GET'])
+@app.route('/api/entities/<entity:entity>/reports', methods=['GET'])
+def get_reports(entity=None):
+    """
+    Export the stats reports of many periods at once, oldest first.
+    Parameters: `from`/`to` (inclusive date range) and `format`
+    ("markdown", the default, or "html").
+    """
+    date_index = get_date_index(entity)
+    balance_sheets = date_index.sheets
+    version, headers, not_modified = _revalidate(entity, balance_sheets)
+    if not_modified is not None:
+        return not_modified
+
+    args = request.args
+    fmt = args.get('format', 'markdown')
+    if fmt not in ('markdown', 'html'):
+        return jsonify({"error": "Invalid query parameter: format must be markdown or html"}), 400
+    try:
+        lo, hi = date_index.span(args.get('from'), args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+
+    def build():
+        reports = _entry(entity)["reports"].materialize(balance_sheets, version)
+        dates = [balance_sheets.dates[i] for i in date_index.positions[lo:hi].tolist()]
+        return [{"date": date, "content": reports[date][fmt]} for date in dates]
+
+    return _encoded_response(entity, "reports", version, (lo, hi, fmt), build, headers)
+
+@app.route('/api/trends', methods=['GET'])
+@app.route('/api/entities/<entity:entity>/trends', methods=['GET'])
+def get_trends_api(entity=None):
+    """
+    Growth, rolling averages and ratio volatility per period, as
+    `{"window": ..., "dates": [...], "metrics": {name: [...]}}`, oldest first.
+    Parameters: `metrics` (comma-separated names, default all) and `from`/`to`.
+    """
+    trends = get_trends(entity)
+    date_index = trends.date_index
+    balance_sheets = date_index.sheets
+    version, headers, not_modified = _revalidate(entity, balance_sheets)
+    if not_modified is not None:
+        return not_modified
+
+    args = request.args
+    try:
+        names = [name.strip() for name in args.get('metrics', ','.join(TREND_NAMES)).split(',') if name.strip()]
+        unknown = [name for name in names if name not in TREND_NAMES]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+        lo, hi = date_index.span(args.get('from'), args.get('to'))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+
+    def build():
+        return {
+            "window": trends.window,
+            "dates": [balance_sheets.dates[i] for i in date_index.positions[lo:hi].tolist()],
+            "metrics": {name: [None if value != value else value for value in trends.metric(name)[lo:hi].tolist()]
+                        for name in names}
+        }
+
+    return _encoded_response(entity, "trends", version, (tuple(names), lo, hi), build, headers)
+
+def _chart_url(entity, version, highlight, fmt):
+    return url_for('get_chart_image', entity=entity, version=version, name=highlight or 'all', fmt=fmt)
+
+@app.route('/charts/financial_briefing.<fmt>', methods=['GET'])
+@app.route('/entities/<entity:entity>/charts/financial_briefing.<fmt>', methods=['GET'])
+def get_chart(fmt, entity=None):
+    """Redirect to the versioned, cacheable URL of the current chart (`?highlight=<date>` marks one period)."""
+    if fmt not in CHART_FORMATS:
+        abort(404)
+    balance_sheets = get_balance_sheets(entity)
+    return redirect(_chart_url(entity, _data_version(entity, balance_sheets), request.args.get('highlight'), fmt))
+
+@app.route('/charts/<version>/<name>.<fmt>', methods=['GET'])
+@app.route('/entities/<entity:entity>/charts/<version>/<name>.<fmt>', methods=['GET'])
+def get_chart_image(version, name, fmt, entity=None):
+    """
+    Server-rendered financial briefing chart for one data version. The URL
+    changes whenever the data does, so the image can be cached indefinitely.
+    """
+    if fmt not in CHART_FORMATS:
+        abort(404)
+    highlight = None if name == 'all' else name
+
+    date_index = get_date_index(entity)
+    balance_sheets = date_index.sheets
+    current = _data_version(entity, balance_sheets)
+    if version == current:
+        if highlight is not None:
+            try:
+                sheet = date_index.exact(highlight)
+            except ValueError:
+                sheet = None
+            if sheet is None or sheet['date'] != highlight:
+                abort(404)
+        path = chart_renderer.render(balance_sheets, version, highlight, fmt)
+    else:
+        path = chart_renderer.path(version, highlight, fmt)
+        if not os.path.exists(path):
+            # Superseded version that is no longer cached; point at the current chart
+            return redirect(_chart_url(entity, current, highlight, fmt))
+
+    response = send_file(path, mimetype=CHART_FORMATS[fmt], max_age=365 * 24 * 3600)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.errorhandler(UnknownEntity)
+def handle_unknown_entity(e):
+    return jsonify({"error": "Unknown entity"}), 404
+
+@app.errorhandler(ExecutorSaturated)
+def handle_executor_saturated(e):
+    return jsonify({"error": "Server is busy, please retry shortly"}), 503, {"Retry-After": "5"}
+
+@app.errorhandler(FutureTimeoutError)
+def handle_job_timeout(e):
+    return jsonify({"error": "Upstream request timed out"}), 504
 
 # Add a new endpoint for async AI analysis
 @app.route('/api/analysis', methods=['POST'])
-def get_analysis():
+@app.route('/api/entities/<entity:entity>/analysis', methods=['POST'])
+def get_analysis(entity=None):
     data = request.json
     target_date = data.get('target_date')
     
     if not target_date:
         return jsonify({"error": "No target date provided"}), 400
     
-    balance_sheets = get_balance_sheets()
-    summary_data = financial_summary(balance_sheets, target_date)
-    
-    prompt = f"""Financial data and calculated ratios:{summary_data}. Using the provided balance sheet data for the specified date, {target_date}, generate a concise financial analysis report evaluating the company's financial health. The report should be structured into the following six sections: 
-    1. Financial Summary: Provide an overview of the key financial figures, including total assets, liabilities, equity, and net income, highlighting any significant observations.
-    2. Breakdown of Financial Components: Analyze and describe the composition of assets, liabilities, and equity, noting any dominant or missing components.
-    3. Key Financial Ratios Interpretation: Evaluate the company's financial health by interpreting relevant ratios (e.g., current ratio, debt-to-equity ratio, return on equity, equity multiplier, debt ratio, and net profit margin) in the context of standard benchmarks.
-    4. Key Findings: Highlight the most critical takeaways from the data, such as liquidity, solvency, profitability, or significant trends.
-    5. Key Insights: Summarize actionable insights that can be drawn from the analysis, focusing on areas of strength, risks, or opportunities.
-    6. Recommendations: Provide practical recommendations for improving financial performance, mitigating risks, or leveraging opportunities.
-    Ensure that the analysis is clear, precise, and easy to understand, using the data provided to support conclusions where applicable."""
+    trends = get_trends(entity)
+    date_index = trends.date_index
+    summary_data = financial_summary(date_index.sheets, target_date, date_index)
+    if summary_data is None:
+        # Nothing to analyze; don't pay for a completion about an empty prompt
+        return jsonify({"error": "No balance sheets available"}), 404
+    # Precomputed on refresh, so the prompt gets the trend figures without any math here
+    period_trends = trends.for_date(summary_data['date'])
     
+    # The GPT call runs on the bounded I/O executor so slow completions can't exhaust the server
     gpt_agent = importlib.import_module("agents.gpt_agent")
-    summary = gpt_agent.call_gpt_agent(prompt)
+    if _wants_stream():
+        return _sse_response(io_executor.stream(gpt_agent.stream_balance_sheet_analysis, summary_data, target_date,
+                                                   period_trends, _resolve_entity(entity)))
+    
+    summary = io_executor.run(gpt_agent.analyze_balance_sheet, summary_data, target_date,
+                              period_trends, _resolve_entity(entity))
     
     return jsonify({"summary": summary})
 
+@app.route('/api/analysis/queue', methods=['GET'])
+def get_analysis_queue():
+    scheduler = importlib.import_module("agents.analysis_scheduler")
+    return jsonify(scheduler.analysis_scheduler.status())
+
+def _answer_chat(data, user_query):
+    # Imported on first use so the chat stack isn't loaded on boot
+    from data.chatbot import generate_response, get_relevant_tables
+    relevant_tables = get_relevant_tables(data, user_query)
+    return generate_response(data, relevant_tables, user_query)
+
+def _stream_chat(data, user_query):
+    from data.chatbot import generate_response_stream, get_relevant_tables
+    relevant_tables = get_relevant_tables(data, user_query)
+    yield from generate_response_stream(data, relevant_tables, user_query)
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    data = load_data()  # Load your data
+    from data.chatbot import load_data, CatalogUnavailable
     user_query = request.json.get('query')
-    relevant_tables = get_relevant_tables(data, user_query)
-    response = generate_response(data, relevant_tables, user_query)
+    # Loaded before any response starts, so an empty catalog is a 503 on both paths
+    try:
+        data = io_executor.run(load_data)  # Load your data
+    except CatalogUnavailable:
+        return jsonify({"error": "No tables are available, please retry shortly"}), 503, {"Retry-After": "30"}
+
+    if _wants_stream():
+        return _sse_response(io_executor.stream(_stream_chat, data, user_query))
+    
+    response = io_executor.run(_answer_chat, data, user_query)
     return jsonify({'response': response})
 
 if __name__ == "__main__":
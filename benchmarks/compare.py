@@ -0,0 +1,54 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 10]
+
+Prints the p50 and throughput change for every benchmark present in both
+files. Changes beyond the threshold (percent) are flagged as faster/slower.
+"""
+import sys
+import argparse
+from benchmarks.harness import load_results
+
+def _change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change reported as a regression or speed-up")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    print(f"baseline {baseline['revision']}  vs  candidate {candidate['revision']}")
+    print(f"{'benchmark':<55} {'p50 before':>12} {'p50 after':>12} {'p50':>8} {'ops/s':>8} {'peak mem':>9}")
+
+    regressions = 0
+    for name in sorted(set(baseline["results"]) & set(candidate["results"])):
+        before, after = baseline["results"][name], candidate["results"][name]
+        p50 = _change(before["p50_ms"], after["p50_ms"])
+        ops = _change(before["ops_per_sec"], after["ops_per_sec"])
+        memory = _change(before.get("peak_mem_kb"), after.get("peak_mem_kb"))
+        flag = ""
+        if p50 is not None and p50 > args.threshold:
+            flag = "  slower"
+            regressions += 1
+        elif p50 is not None and p50 < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<55} {before['p50_ms']:>10.3f}ms {after['p50_ms']:>10.3f}ms "
+              f"{_format(p50):>8} {_format(ops):>8} {_format(memory):>9}{flag}")
+
+    missing = sorted(set(baseline["results"]) ^ set(candidate["results"]))
+    if missing:
+        print(f"{len(missing)} benchmarks only present in one file: {', '.join(missing)}")
+    return 1 if regressions else 0
+
+def _format(change):
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+if __name__ == "__main__":
+    sys.exit(main())
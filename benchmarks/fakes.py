@@ -0,0 +1,113 @@
+import time
+from types import SimpleNamespace
+
+class _Query:
+    """Just enough of the postgrest query builder for the app's queries."""
+
+    def __init__(self, backend, table):
+        self._backend = backend
+        self._table = table
+        self._filters = []
+        self._order = None
+
+    def select(self, columns="*"):
+        self._columns = [column.strip() for column in columns.split(",")] if columns != "*" else None
+        return self
+
+    def gte(self, column, value):
+        self._filters.append((column, lambda cell: str(cell) >= str(value)))
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, lambda cell: str(cell) == str(value)))
+        return self
+
+    def order(self, column):
+        self._order = column
+        return self
+
+    def execute(self):
+        time.sleep(self._backend.latency)
+        rows = self._backend.tables.get(self._table, [])
+        for column, matches in self._filters:
+            rows = [row for row in rows if matches(row.get(column))]
+        if self._order:
+            rows = sorted(rows, key=lambda row: str(row.get(self._order)))
+        if self._columns:
+            rows = [{column: row.get(column) for column in self._columns} for row in rows]
+        return SimpleNamespace(data=rows, error=None)
+
+class _Rpc:
+    def __init__(self, backend, name):
+        self._backend = backend
+        self._name = name
+
+    def execute(self):
+        time.sleep(self._backend.latency)
+        if self._name == "get_table_names":
+            return SimpleNamespace(data=[{"tablename": name} for name in self._backend.tables])
+        return SimpleNamespace(data=None)
+
+class FakeSupabase:
+    """In-memory stand-in for the Supabase client with a fixed per-query latency (seconds)."""
+
+    def __init__(self, tables, latency=0.0):
+        self.tables = tables
+        self.latency = latency
+        self.queries = 0
+
+    def table(self, name):
+        self.queries += 1
+        return _Query(self, name)
+
+    def rpc(self, name, params=None):
+        self.queries += 1
+        return _Rpc(self, name)
+
+class _Completions:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, messages, model, stream=False, **kwargs):
+        backend = self._backend
+        backend.calls += 1
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        text = backend.reply
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(text) // 4,
+                                total_tokens=prompt_tokens + len(text) // 4)
+        if not stream:
+            time.sleep(backend.latency + backend.token_latency * len(text.split()))
+            message = SimpleNamespace(content=text, role="assistant")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage, model=model)
+        return self._stream(text, model)
+
+    def _stream(self, text, model):
+        backend = self._backend
+        time.sleep(backend.latency)
+        for word in text.split(" "):
+            time.sleep(backend.token_latency)
+            delta = SimpleNamespace(content=word + " ")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None, model=model)
+
+class FakeOpenAI:
+    """
+    Stand-in for the OpenAI client. `latency` is the time to first token and
+    `token_latency` the time per generated word, for both plain and streamed calls.
+    """
+
+    def __init__(self, reply=None, latency=0.0, token_latency=0.0):
+        self.reply = reply or ("# Financial Analysis\n\nThe company remains solvent with a stable debt ratio. " * 20)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+def install(supabase=None, openai=None):
+    """Make get_supabase_client / get_openai_client return the given fakes."""
+    from data import clients
+
+    with clients._clients_lock:
+        if supabase is not None:
+            clients._clients["supabase"] = supabase
+        if openai is not None:
+            clients._clients["openai"] = openai
@@ -0,0 +1,71 @@
+import gc
+import json
+import time
+import platform
+import subprocess
+import tracemalloc
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+def measure(fn, repeat=20, warmup=2, min_time=0.0, trace_memory=True):
+    """
+    Time `fn()` `repeat` times (more if `min_time` seconds haven't passed)
+    after `warmup` untimed calls. Peak memory is the tracemalloc peak of one
+    extra call, so tracing doesn't distort the timings.
+    """
+    for _ in range(warmup):
+        fn()
+
+    gc.collect()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - started < min_time:
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    total = time.perf_counter() - started
+
+    peak = None
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "ops_per_sec": round(len(timings) / total, 3) if total else None,
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 4),
+        "p50_ms": round(_percentile(timings, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(timings, 0.99) * 1000, 4),
+        "peak_mem_kb": round(peak / 1024, 1) if peak is not None else None,
+    }
+
+def git_revision():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True)
+        return revision.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def environment():
+    return {"python": platform.python_version(), "machine": platform.machine(), "platform": platform.platform()}
+
+def write_results(path, results, params):
+    with open(path, "w") as f:
+        json.dump({"revision": git_revision(), "environment": environment(), "params": params,
+                   "results": results}, f, indent=2, sort_keys=True)
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,53 @@
+"""
+The original per-row implementations, kept so the benchmarks can show the
+current code against them on the same machine and the same rows.
+"""
+
+def balance_briefing(data_accounting_balance_sheets):
+    """The dict-per-period loop balance_briefing used before BalanceSheetFrame."""
+    output_data = []
+
+    for balance_sheet in data_accounting_balance_sheets:
+        date = balance_sheet.get("date")
+        report_json = balance_sheet.get("report_json")
+
+        assets = report_json.get("assets", [{}])[0]
+        liabilities = report_json.get("liabilities", [{}])[0]
+        equity = report_json.get("equity", [{}])[0]
+
+        asset_sub = [{"name": item.get("name"), "value": item.get("value")}
+                     for item in assets.get("sub_items", [])]
+        liability_sub = [{"name": item.get("name"), "value": item.get("value")}
+                         for item in liabilities.get("sub_items", [])]
+        equity_sub = [{"name": item.get("name"), "value": item.get("value")}
+                      for item in equity.get("sub_items", [])]
+
+        total_assets = assets.get("value") or 1
+        total_liabilities = liabilities.get("value") or 1
+        total_equity = equity.get("value") or 1
+
+        net_income = next((item.get("value") for item in equity.get("sub_items", [])
+                          if item.get("name") == "Net Income"), 0)
+
+        ratios = {
+            "current_ratio": total_assets / total_liabilities,
+            "debt_to_equity_ratio": total_liabilities / total_equity,
+            "return_on_equity": net_income / total_equity,
+            "equity_multiplier": total_assets / total_equity,
+            "debt_ratio": total_liabilities / total_assets,
+            "net_profit_margin": net_income / total_assets
+        }
+
+        output_data.append({
+            "date": date,
+            "total_asset": total_assets,
+            "asset_breakdown": asset_sub,
+            "total_liability": total_liabilities,
+            "liability_breakdown": liability_sub,
+            "total_equity": total_equity,
+            "equity_breakdown": equity_sub,
+            "net_income": net_income,
+            "ratios": ratios
+        })
+
+    return output_data
@@ -0,0 +1,215 @@
+"""
+Benchmarks for the balance sheet pipeline and the Flask routes.
+
+    python -m benchmarks.run                      # default sizes, writes benchmarks/results/<revision>.json
+    python -m benchmarks.run --sizes 10,1000,100000 --only balance_briefing
+    python -m benchmarks.compare benchmarks/results/abc123.json benchmarks/results/def456.json
+
+Supabase and OpenAI are replaced by in-process fakes with configurable
+latency, so nothing here needs network access or credentials.
+"""
+import os
+import sys
+import random
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+from benchmarks.synthetic import generate_report_rows, generate_catalog
+from benchmarks.fakes import FakeSupabase, FakeOpenAI, install
+from benchmarks.harness import measure, write_results, git_revision
+from benchmarks import reference
+
+DEFAULT_SIZES = "10,1000,10000"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def _repeat_for(size, base):
+    # Keep large sizes from taking minutes while small ones still get stable percentiles
+    return max(3, min(base, int(base * 1000 / max(size, 1))))
+
+def micro_benchmarks(size, args):
+    from data.processing import balance_briefing, financial_summary, DateIndex
+    from data.markdown_generation import generate_markdown
+    from data.report_store import ReportStore
+    from data.serialization import dumps
+    from data.snapshot_store import save_snapshot, load_snapshot
+    from data.downsampling import lttb
+    from data.trends import TrendAnalytics
+
+    rows = generate_report_rows(size, min_items=args.min_items, max_items=args.max_items, shuffle=True, seed=size)
+    frame = balance_briefing(rows).sort_by_date()
+    date_index = DateIndex(frame)
+    records = frame.to_records()
+    rng = random.Random(size)
+    lookup_dates = [rng.choice(frame.dates) for _ in range(256)]
+    repeat = _repeat_for(size, args.repeat)
+
+    cases = {
+        "balance_briefing": lambda: balance_briefing(rows),
+        # The pre-frame dict loop on the same rows; balance_briefing should be no slower
+        "balance_briefing_reference": lambda: reference.balance_briefing(rows),
+        "sort_by_date": lambda: balance_briefing(rows).sort_by_date(),
+        "date_index_build": lambda: DateIndex(frame),
+        "financial_summary": lambda: financial_summary(frame, rng.choice(lookup_dates), date_index),
+        "to_records": lambda: frame.to_records(),
+        "dumps_records": lambda: dumps(records),
+        "generate_markdown": lambda: generate_markdown(records[rng.randrange(len(records))]),
+        "materialize_reports": lambda: ReportStore().materialize(frame, "bench"),
+        "fingerprint": lambda: frame.fingerprint(),
+        "trend_analytics": lambda: TrendAnalytics(date_index),
+        "lttb_500": lambda: lttb(date_index.keys.view("int64"), frame.total_asset[date_index.positions], 500),
+    }
+
+    snapshot_dir = tempfile.mkdtemp(prefix="bench-snapshot-")
+    snapshot_path = os.path.join(snapshot_dir, "balance_sheets.snapshot")
+    save_snapshot(frame, date_index, {}, snapshot_path)
+    cases["snapshot_save"] = lambda: save_snapshot(frame, date_index, {}, snapshot_path)
+    cases["snapshot_load"] = lambda: load_snapshot(snapshot_path)
+
+    if size <= args.max_plot_size:
+        try:
+            from data.visualization import plot_financial_briefing
+        except ImportError:
+            plot_financial_briefing = None
+        if plot_financial_briefing is not None:
+            cases["plot_financial_briefing"] = lambda: plot_financial_briefing(records)
+
+    results = {}
+    for name, fn in cases.items():
+        if args.only and args.only not in name:
+            continue
+        case_repeat = 3 if name == "plot_financial_briefing" else repeat
+        results[f"micro/{name}/n={size}"] = measure(fn, repeat=case_repeat, warmup=1)
+        _report(f"micro/{name}/n={size}", results[f"micro/{name}/n={size}"])
+    return results
+
+def _prepare_app(size, args):
+    rows = generate_report_rows(size, min_items=args.min_items, max_items=args.max_items, seed=size)
+    tables = generate_catalog(tables=args.tables)
+    tables["accounting_balance_sheets"] = rows
+    supabase = FakeSupabase(tables, latency=args.supabase_latency / 1000)
+    llm = FakeOpenAI(latency=args.llm_latency / 1000, token_latency=args.llm_token_latency / 1000)
+    install(supabase=supabase, openai=llm)
+
+    import app as flask_app
+    return flask_app, rows
+
+def _reset_balance_sheets(flask_app):
+    # Fresh entries skip the snapshot warm start, so the next request refetches
+    with flask_app._cache_lock:
+        for entity in flask_app._balance_sheets_cache:
+            flask_app._balance_sheets_cache[entity] = flask_app._new_entry(entity)
+
+def e2e_benchmarks(size, args):
+    flask_app, rows = _prepare_app(size, args)
+    gpt_agent = __import__("agents.gpt_agent", fromlist=["ANALYSIS_PROMPT_VERSION"])
+    client = flask_app.app.test_client()
+    dates = sorted(row["date"] for row in rows)
+    rng = random.Random(size)
+    repeat = _repeat_for(size, args.repeat)
+
+    def cold_home():
+        _reset_balance_sheets(flask_app)
+        client.get("/")
+
+    client.get("/")
+    etag = client.get("/api/balance_sheets").headers["ETag"]
+    client.post("/api/analysis", json={"target_date": dates[-1]})
+
+    def analysis_miss():
+        # A new prompt version gives every call a fresh cache key
+        gpt_agent.ANALYSIS_PROMPT_VERSION += 1
+        client.post("/api/analysis", json={"target_date": dates[-1]})
+
+    cases = {
+        "cold_load": cold_home,
+        "get_home": lambda: client.get("/"),
+        "post_home": lambda: client.post("/", data={"target_date": rng.choice(dates)}),
+        "api_balance_sheets": lambda: client.get("/api/balance_sheets"),
+        "api_balance_sheets_gzip": lambda: client.get("/api/balance_sheets", headers={"Accept-Encoding": "gzip"}),
+        "api_balance_sheets_304": lambda: client.get("/api/balance_sheets", headers={"If-None-Match": etag}),
+        "api_balance_sheets_page": lambda: client.get("/api/balance_sheets?limit=100&fields=ratios"),
+        "api_series": lambda: client.get("/api/balance_sheets/series?points=800"),
+        "api_reports": lambda: client.get("/api/reports"),
+        "api_trends": lambda: client.get("/api/trends?metrics=total_asset_yoy,debt_ratio_volatility"),
+        "api_analysis_hit": lambda: client.post("/api/analysis", json={"target_date": dates[-1]}),
+        "api_analysis_miss": analysis_miss,
+        "api_chat": lambda: client.post("/api/chat", json={"query": "What was the debt ratio in the balance sheets?"}),
+    }
+
+    results = {}
+    for name, fn in cases.items():
+        if args.only and args.only not in name:
+            continue
+        case_repeat = max(3, repeat // 4) if name in ("cold_load", "api_analysis_miss", "api_chat") else repeat
+        results[f"e2e/{name}/n={size}"] = measure(fn, repeat=case_repeat, warmup=1)
+        _report(f"e2e/{name}/n={size}", results[f"e2e/{name}/n={size}"])
+
+    if not args.only or "concurrent" in args.only:
+        name = f"e2e/concurrent_post_home/n={size}/threads={args.threads}"
+        results[name] = _concurrent(flask_app, dates, args.threads, repeat)
+        _report(name, results[name])
+    return results
+
+def _concurrent(flask_app, dates, threads, per_thread):
+    """Aggregate throughput of `threads` clients each posting the report form `per_thread` times."""
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        client = flask_app.app.test_client()
+        barrier.wait()
+        for i in range(per_thread):
+            client.post("/", data={"target_date": dates[(i * 7919) % len(dates)]})
+
+    def run():
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+
+    result = measure(run, repeat=3, warmup=0, trace_memory=False)
+    result["requests_per_sec"] = round(threads * per_thread * result["ops_per_sec"], 2)
+    return result
+
+def _report(name, result):
+    print(f"{name:<55} {result['ops_per_sec']:>12.2f} ops/s  p50 {result['p50_ms']:>10.3f} ms  "
+          f"p99 {result['p99_ms']:>10.3f} ms  peak {result['peak_mem_kb'] or 0:>10.1f} KiB", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated period counts for micro benchmarks")
+    parser.add_argument("--e2e-size", type=int, default=1000, help="periods served by the fake Supabase (0 to skip)")
+    parser.add_argument("--min-items", type=int, default=3, help="fewest line items per section")
+    parser.add_argument("--max-items", type=int, default=8, help="most line items per section")
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per case at 1000 periods")
+    parser.add_argument("--max-plot-size", type=int, default=1000, help="largest size to run the matplotlib plot at")
+    parser.add_argument("--supabase-latency", type=float, default=20, help="fake Supabase latency per query (ms)")
+    parser.add_argument("--llm-latency", type=float, default=300, help="fake LLM time to first token (ms)")
+    parser.add_argument("--llm-token-latency", type=float, default=0.5, help="fake LLM time per word (ms)")
+    parser.add_argument("--tables", type=int, default=12, help="tables in the fake chat catalog")
+    parser.add_argument("--threads", type=int, default=8, help="clients in the concurrent benchmark")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<revision>.json)")
+    args = parser.parse_args(argv)
+
+    # Set before any app module is imported: everything the app writes goes to a
+    # throwaway directory, and nothing is generated in the background
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-cache-")
+    os.environ["ANALYSIS_PREGENERATE"] = "0"
+
+    results = {}
+    for size in (int(size) for size in args.sizes.split(",") if size):
+        results.update(micro_benchmarks(size, args))
+    if args.e2e_size:
+        results.update(e2e_benchmarks(args.e2e_size, args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{git_revision()}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    write_results(output, results, {key: value for key, value in vars(args).items() if key != "output"}
+                  | {"started": datetime.now().isoformat(timespec="seconds")})
+    print(f"Wrote {len(results)} results to {output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import random
+from datetime import date, timedelta
+
+ASSET_NAMES = ["Cash", "Accounts Receivable", "Inventory", "Prepaid Expenses", "Property and Equipment",
+               "Intangible Assets", "Short-term Investments", "Long-term Investments"]
+LIABILITY_NAMES = ["Accounts Payable", "Accrued Expenses", "Short-term Debt", "Deferred Revenue",
+                   "Long-term Debt", "Taxes Payable"]
+EQUITY_NAMES = ["Common Stock", "Additional Paid-in Capital", "Retained Earnings", "Treasury Stock"]
+
+def _items(rng, names, min_items, max_items, null_rate):
+    count = rng.randint(min_items, max_items)
+    items = []
+    for k in range(count):
+        # Beyond the common names, widths are padded with numbered accounts
+        name = names[k] if k < len(names) else f"{names[k % len(names)]} {k // len(names)}"
+        value = None if rng.random() < null_rate else round(rng.uniform(0, 250_000), 2)
+        items.append({"name": name, "value": value})
+    return items
+
+def generate_report_rows(periods, min_items=3, max_items=8, null_rate=0.02, step_days=1,
+                         start=date(1800, 1, 1), shuffle=False, seed=0):
+    """
+    Rows shaped like the `accounting_balance_sheets` table: a `date` and a
+    `report_json` with assets, liabilities and equity sections. Breakdown
+    widths vary between `min_items` and `max_items` per section, and about
+    `null_rate` of the line-item values are None. Output is deterministic
+    for a given seed.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(periods):
+        assets = _items(rng, ASSET_NAMES, min_items, max_items, null_rate)
+        liabilities = _items(rng, LIABILITY_NAMES, min_items, max_items, null_rate)
+        equity = _items(rng, EQUITY_NAMES, min_items, max_items, null_rate)
+        net_income = round(rng.uniform(-20_000, 60_000), 2)
+        equity.append({"name": "Net Income", "value": net_income})
+
+        total_asset = sum(item["value"] or 0 for item in assets)
+        total_liability = sum(item["value"] or 0 for item in liabilities)
+        rows.append({
+            "date": (start + timedelta(days=i * step_days)).isoformat(),
+            "report_json": {
+                "assets": [{"name": "Total Assets", "value": round(total_asset, 2), "sub_items": assets}],
+                "liabilities": [{"name": "Total Liabilities", "value": round(total_liability, 2),
+                                 "sub_items": liabilities}],
+                "equity": [{"name": "Total Equity", "value": round(total_asset - total_liability, 2),
+                            "sub_items": equity}],
+            },
+        })
+    if shuffle:
+        rng.shuffle(rows)
+    return rows
+
+def generate_catalog(tables=12, rows_per_table=200, seed=0):
+    """A chat catalog of generic accounting tables, as load_data would return it."""
+    rng = random.Random(seed)
+    catalog = {}
+    for t in range(tables):
+        name = f"accounting_table_{t}"
+        catalog[name] = [
+            {"id": r, "date": (date(2020, 1, 1) + timedelta(days=r)).isoformat(),
+             "account": rng.choice(ASSET_NAMES + LIABILITY_NAMES), "amount": round(rng.uniform(-1e4, 1e5), 2)}
+            for r in range(rows_per_table)
+        ]
+    catalog["accounting_balance_sheets"] = generate_report_rows(min(rows_per_table, 50), seed=seed)
+    return catalog
@@ -0,0 +1,337 @@
+import sys
+import hashlib
+import threading
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+import numpy as np
+
+RATIO_NAMES = (
+    "current_ratio",
+    "debt_to_equity_ratio",
+    "return_on_equity",
+    "equity_multiplier",
+    "debt_ratio",
+    "net_profit_margin",
+)
+
+SECTIONS = ("asset_breakdown", "liability_breakdown", "equity_breakdown")
+
+class NameTable:
+    """Append-only table that interns line-item names to small integer ids."""
+
+    def __init__(self, names=()):
+        self.names = list(names)
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        name_id = self._ids.get(name)
+        if name_id is None:
+            with self._lock:
+                name_id = self._ids.get(name)
+                if name_id is None:
+                    name_id = len(self.names)
+                    self.names.append(name)
+                    self._ids[name] = name_id
+        return name_id
+
+# Shared by every frame in the process, so "Net Income" and friends are stored once
+LINE_ITEM_NAMES = NameTable()
+
+def _value(item):
+    value = item.get("value")
+    return np.nan if value is None else value
+
+def _total_with_fallback(values):
+    # Same fallback as the scalar version: a missing or zero total counts as 1
+    return np.where(np.isnan(values) | (values == 0), 1.0, values)
+
+def _py(value):
+    value = value.item()
+    return None if value != value else value  # NaN -> None
+
+class Breakdown:
+    """
+    Line items of one balance sheet section for every period, stored as
+    parallel arrays: period i owns entries offsets[i]:offsets[i + 1] of
+    name_ids (into LINE_ITEM_NAMES) and values (NaN where the value is None).
+    """
+
+    __slots__ = ("offsets", "name_ids", "values")
+
+    def __init__(self, offsets, name_ids, values):
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.name_ids = np.asarray(name_ids, dtype=np.int32)
+        self.values = np.asarray(values, dtype=np.float64)
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.name_ids.nbytes + self.values.nbytes
+
+    def items(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        names = LINE_ITEM_NAMES.names
+        return [{"name": names[name_id], "value": None if value != value else value}
+                for name_id, value in zip(self.name_ids[start:end].tolist(), self.values[start:end].tolist())]
+
+    def all_items(self):
+        names = LINE_ITEM_NAMES.names
+        offsets = self.offsets.tolist()
+        name_ids = self.name_ids.tolist()
+        values = self.values.tolist()
+        return [[{"name": names[name_ids[j]], "value": None if values[j] != values[j] else values[j]}
+                 for j in range(offsets[i], offsets[i + 1])]
+                for i in range(len(offsets) - 1)]
+
+    def take(self, positions):
+        starts = self.offsets[:-1][positions]
+        lengths = self.offsets[1:][positions] - starts
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        gather = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return Breakdown(offsets, self.name_ids[gather], self.values[gather])
+
+    def concat(self, other):
+        return Breakdown(
+            np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]]),
+            np.concatenate([self.name_ids, other.name_ids]),
+            np.concatenate([self.values, other.values]),
+        )
+
+def _breakdown(sub_items):
+    # One list of line items per period, flattened into a Breakdown
+    offsets = np.zeros(len(sub_items) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, sub_items), dtype=np.int64, count=len(sub_items)), out=offsets[1:])
+    items = [item for period in sub_items for item in period]
+    names = [item.get("name") for item in items]
+    ids = {name: LINE_ITEM_NAMES.intern(name) for name in set(names)}
+    name_ids = np.fromiter(map(ids.__getitem__, names), dtype=np.int32, count=len(names))
+    values = np.array([item.get("value") for item in items], dtype=np.float64)
+    return Breakdown(offsets, name_ids, values)
+
+# Keys of an API record, in output order
+RECORD_FIELDS = ("date", "total_asset", "asset_breakdown", "total_liability", "liability_breakdown",
+                 "total_equity", "equity_breakdown", "net_income", "ratios")
+
+# Shorthands accepted wherever a list of record fields is expected
+FIELD_GROUPS = {
+    "totals": ("total_asset", "total_liability", "total_equity", "net_income"),
+    "breakdowns": SECTIONS,
+}
+
+class BalanceSheetRecord(Mapping):
+    """
+    Read-only view of one period of a BalanceSheetFrame.
+
+    Behaves like the dict balance_briefing used to return; breakdown lists and
+    the ratios dict are built from the frame's arrays when accessed.
+    """
+
+    __slots__ = ("_frame", "_index")
+
+    _KEYS = RECORD_FIELDS
+
+    def __init__(self, frame, index):
+        self._frame = frame
+        self._index = index
+
+    def __getitem__(self, key):
+        frame, i = self._frame, self._index
+        if key == "date":
+            return frame.dates[i]
+        if key in ("total_asset", "total_liability", "total_equity", "net_income"):
+            return _py(getattr(frame, key)[i])
+        if key in SECTIONS:
+            return frame.breakdowns[SECTIONS.index(key)].items(i)
+        if key == "ratios":
+            return {name: _py(frame.ratios[name][i]) for name in RATIO_NAMES}
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def to_dict(self):
+        return {key: self[key] for key in self._KEYS}
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+class BalanceSheetFrame(Sequence):
+    """
+    Column-oriented store of processed balance sheets.
+
+    Totals, net income and the six ratios live in NumPy arrays with one slot
+    per period, so ratios are computed for the whole history in a handful of
+    vectorized operations. Breakdown line items are held as parallel arrays
+    against a shared name table instead of per-period lists of dicts.
+    Indexing returns a BalanceSheetRecord view; to_records() produces the
+    JSON shape and should only be called at the API edge.
+    """
+
+    def __init__(self, dates, total_asset, total_liability, total_equity, net_income, breakdowns, ratios=None):
+        self.dates = list(dates)
+        self.total_asset = np.asarray(total_asset, dtype=np.float64)
+        self.total_liability = np.asarray(total_liability, dtype=np.float64)
+        self.total_equity = np.asarray(total_equity, dtype=np.float64)
+        self.net_income = np.asarray(net_income, dtype=np.float64)
+        # One Breakdown per section, in SECTIONS order
+        self.breakdowns = tuple(breakdowns)
+        # Ratios are only computed for new rows; take/concat carry existing ones over
+        self.ratios = ratios if ratios is not None else self._compute_ratios()
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [Breakdown([0], [], []) for _ in SECTIONS])
+
+    @classmethod
+    def from_reports(cls, data_accounting_balance_sheets):
+        """
+        Build a frame from raw `accounting_balance_sheets` rows. Each column is
+        pulled out of the rows in one comprehension and converted to an array
+        in one call; None values become NaN in the conversion.
+        """
+        rows = data_accounting_balance_sheets
+        count = len(rows)
+        dates = [row.get("date") for row in rows]
+        reports = [row.get("report_json") for row in rows]
+        sections = [[report.get(key, [{}])[0] for report in reports] for key in ("assets", "liabilities", "equity")]
+
+        totals = np.array([[section.get("value") for section in column] for column in sections],
+                          dtype=np.float64).reshape(3, count)
+        totals = _total_with_fallback(totals)
+        breakdowns = [_breakdown([section.get("sub_items", []) for section in column]) for column in sections]
+
+        # Net income is the first "Net Income" equity item of each period, 0 when there is none
+        net_income = np.zeros(count, dtype=np.float64)
+        equity = breakdowns[2]
+        net_income_id = LINE_ITEM_NAMES._ids.get("Net Income")
+        if net_income_id is not None:
+            found = np.flatnonzero(equity.name_ids == net_income_id)
+            periods = np.searchsorted(equity.offsets, found, side="right") - 1
+            periods, first = np.unique(periods, return_index=True)
+            net_income[periods] = equity.values[found[first]]
+        return cls(dates, totals[0], totals[1], totals[2], net_income, breakdowns)
+
+    def _compute_ratios(self):
+        assets, liabilities, equity = self.total_asset, self.total_liability, self.total_equity
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {
+                "current_ratio": assets / liabilities,
+                "debt_to_equity_ratio": liabilities / equity,
+                "return_on_equity": self.net_income / equity,
+                "equity_multiplier": assets / equity,
+                "debt_ratio": liabilities / assets,
+                "net_profit_margin": self.net_income / assets,
+            }
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the frame's columns."""
+        arrays = [self.total_asset, self.total_liability, self.total_equity, self.net_income]
+        arrays.extend(self.ratios.values())
+        return (sum(array.nbytes for array in arrays)
+                + sum(breakdown.nbytes for breakdown in self.breakdowns)
+                + sys.getsizeof(self.dates) + sum(map(sys.getsizeof, self.dates)))
+
+    def fingerprint(self):
+        """
+        Short content hash of the frame, usable as a data version. Line-item ids
+        are canonicalised by name first, so the same data hashes the same in
+        every process regardless of interning order.
+        """
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update("\x1f".join(self.dates).encode("utf-8"))
+        for array in (self.total_asset, self.total_liability, self.total_equity, self.net_income):
+            digest.update(np.ascontiguousarray(array).tobytes())
+
+        names = LINE_ITEM_NAMES.names
+        for breakdown in self.breakdowns:
+            used = np.unique(breakdown.name_ids)
+            used_names = [str(names[name_id]) for name_id in used.tolist()]
+            order = sorted(range(len(used_names)), key=used_names.__getitem__)
+            rank = np.empty(len(order), dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+            canonical = rank[np.searchsorted(used, breakdown.name_ids)] if len(used) else breakdown.name_ids
+            digest.update("\x1f".join(sorted(used_names)).encode("utf-8"))
+            digest.update(np.ascontiguousarray(breakdown.offsets).tobytes())
+            digest.update(np.ascontiguousarray(canonical, dtype=np.int32).tobytes())
+            digest.update(np.ascontiguousarray(breakdown.values).tobytes())
+        return digest.hexdigest()
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("balance sheet index out of range")
+        return BalanceSheetRecord(self, index)
+
+    def take(self, positions):
+        """Return a new frame holding the periods at `positions`, in that order."""
+        positions = np.asarray(positions, dtype=np.intp)
+        return BalanceSheetFrame(
+            [self.dates[i] for i in positions],
+            self.total_asset[positions],
+            self.total_liability[positions],
+            self.total_equity[positions],
+            self.net_income[positions],
+            [breakdown.take(positions) for breakdown in self.breakdowns],
+            {name: values[positions] for name, values in self.ratios.items()},
+        )
+
+    def concat(self, other):
+        return BalanceSheetFrame(
+            self.dates + other.dates,
+            np.concatenate([self.total_asset, other.total_asset]),
+            np.concatenate([self.total_liability, other.total_liability]),
+            np.concatenate([self.total_equity, other.total_equity]),
+            np.concatenate([self.net_income, other.net_income]),
+            [mine.concat(theirs) for mine, theirs in zip(self.breakdowns, other.breakdowns)],
+            {name: np.concatenate([values, other.ratios[name]]) for name, values in self.ratios.items()},
+        )
+
+    def date_keys(self):
+        """Parsed, timezone-naive dates as a datetime64 array."""
+        return np.array([datetime.fromisoformat(date).replace(tzinfo=None) for date in self.dates],
+                        dtype="datetime64[us]")
+
+    def sort_by_date(self):
+        """Return a copy ordered by date; raises ValueError/TypeError on unparsable dates."""
+        order = np.argsort(self.date_keys(), kind="stable")
+        if np.array_equal(order, np.arange(len(self))):
+            return self
+        return self.take(order)
+
+    def to_records(self, fields=None):
+        """
+        Materialize every period as the JSON-ready dict shape used by the API.
+        `fields` limits each record to those keys (plus "date"); only the
+        requested columns are converted.
+        """
+        keys = RECORD_FIELDS if fields is None else [key for key in RECORD_FIELDS if key == "date" or key in fields]
+        columns = {}
+        for key in keys:
+            if key == "date":
+                columns[key] = self.dates
+            elif key in SECTIONS:
+                columns[key] = self.breakdowns[SECTIONS.index(key)].all_items()
+            elif key == "ratios":
+                ratio_columns = [self.ratios[name].tolist() for name in RATIO_NAMES]
+                columns[key] = [{name: (None if value != value else value)
+                                 for name, value in zip(RATIO_NAMES, values)}
+                                for values in zip(*ratio_columns)] if len(self) else []
+            elif key == "net_income":
+                columns[key] = [None if value != value else value for value in self.net_income.tolist()]
+            else:
+                columns[key] = getattr(self, key).tolist()
+        return [dict(zip(keys, values)) for values in zip(*columns.values())]
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from data.get_all_tables import get_all_tables, fetch_all_tables
+from data.metrics import cache_events
+
+# Default time-to-live (seconds) for a cached table
+CATALOG_TTL_SECONDS = float(os.environ.get("CATALOG_TTL_SECONDS", "900"))
+# Per-table overrides, e.g. "accounting_balance_sheets=3600,accounting_accounts=300"
+CATALOG_TABLE_TTLS = os.environ.get("CATALOG_TABLE_TTLS", "")
+# Approximate upper bound on the encoded size of all cached tables
+CATALOG_MAX_BYTES = int(os.environ.get("CATALOG_MAX_BYTES", str(64 * 1024 * 1024)))
+# How often the background thread looks for expired tables
+CATALOG_REFRESH_INTERVAL = float(os.environ.get("CATALOG_REFRESH_INTERVAL", "60"))
+
+def _parse_table_ttls(spec):
+    ttls = {}
+    for part in spec.split(","):
+        if "=" not in part:
+            continue
+        name, ttl = part.split("=", 1)
+        try:
+            ttls[name.strip()] = float(ttl)
+        except ValueError:
+            print(f"Ignoring invalid catalog TTL: {part}")
+    return ttls
+
+class _Entry:
+    __slots__ = ("rows", "size", "digest", "expires_at", "version")
+
+    def __init__(self, rows, size, digest, expires_at, version):
+        self.rows = rows
+        self.size = size
+        self.digest = digest
+        self.expires_at = expires_at
+        self.version = version
+
+class CatalogCache:
+    """
+    In-memory cache of the chat data catalog (table name -> rows).
+
+    Tables expire individually after their TTL, the whole cache is held under
+    a byte budget with least-recently-used eviction, and expired tables are
+    served stale while a background thread refreshes them. Concurrent misses
+    for a table share one fetch, and tables larger than the whole budget are
+    left out of the catalog until their TTL passes. `version` is bumped
+    whenever the contents of any table change, so dependants (routing indexes,
+    summaries) can tell when to rebuild.
+    """
+
+    def __init__(self, default_ttl=CATALOG_TTL_SECONDS, table_ttls=None,
+                 max_bytes=CATALOG_MAX_BYTES, refresh_interval=CATALOG_REFRESH_INTERVAL):
+        self.default_ttl = default_ttl
+        self.table_ttls = table_ttls if table_ttls is not None else _parse_table_ttls(CATALOG_TABLE_TTLS)
+        self.max_bytes = max_bytes
+        self.refresh_interval = refresh_interval
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Table -> event set when the fetch a request started for it is done
+        self._loading = {}
+        # Tables too large to cache -> when to try them again
+        self._oversized = {}
+        self._table_names = None
+        self._table_names_expires_at = 0
+        self._version = 0
+        self._lock = threading.RLock()
+        self._refresher = None
+        self._wakeup = threading.Event()
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def ttl_for(self, table):
+        return self.table_ttls.get(table, self.default_ttl)
+
+    def table_names(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._table_names is not None and now < self._table_names_expires_at:
+                return self._table_names
+
+        names = get_all_tables()
+        with self._lock:
+            if names:
+                if names != self._table_names:
+                    self._version += 1
+                self._table_names = names
+                self._table_names_expires_at = now + self.default_ttl
+            return self._table_names
+
+    def get_catalog(self, tables=None):
+        """
+        Return a dict of table name -> rows for `tables` (default: every table).
+
+        Missing tables are loaded synchronously in one concurrent batch (or
+        awaited, if another request is already loading them); expired ones are
+        returned as-is and handed to the background refresher. Tables that
+        don't fit the byte budget are omitted.
+        """
+        self._ensure_refresher()
+        names = tables if tables is not None else self.table_names()
+        if not names:
+            return {}
+
+        now = time.monotonic()
+        catalog = {}
+        missing = []
+        stale = False
+        with self._lock:
+            for name in names:
+                if now < self._oversized.get(name, 0):
+                    continue
+                entry = self._entries.get(name)
+                if entry is None:
+                    missing.append(name)
+                    continue
+                self._entries.move_to_end(name)
+                catalog[name] = entry.rows
+                if now >= entry.expires_at:
+                    stale = True
+
+        if stale:
+            self._wakeup.set()
+        hits = len(catalog)
+        if hits:
+            cache_events.inc(hits, cache="catalog", result="hit")
+        if missing:
+            cache_events.inc(len(missing), cache="catalog", result="miss")
+
+        if missing:
+            catalog.update(self._load(missing))
+
+        return catalog
+
+    def _load(self, names):
+        """Fetch and store `names`, joining fetches other requests already started."""
+        claimed = []
+        waiting = []
+        with self._lock:
+            for name in names:
+                loading = self._loading.get(name)
+                if loading is None:
+                    self._loading[name] = threading.Event()
+                    claimed.append(name)
+                else:
+                    waiting.append((name, loading))
+
+        loaded = {}
+        try:
+            if claimed:
+                data, errors = fetch_all_tables(claimed)
+                for table, error in errors.items():
+                    print(f"Error loading table {table}: {error}")
+                for table, rows in data.items():
+                    if self._store(table, rows):
+                        loaded[table] = rows
+        finally:
+            with self._lock:
+                for name in claimed:
+                    self._loading.pop(name).set()
+
+        for name, loading in waiting:
+            loading.wait()
+            with self._lock:
+                entry = self._entries.get(name)
+            if entry is not None:
+                loaded[name] = entry.rows
+        return loaded
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table is None:
+                self._entries.clear()
+                self._oversized.clear()
+                self._bytes = 0
+                self._table_names = None
+            else:
+                self._oversized.pop(table, None)
+                if table in self._entries:
+                    self._bytes -= self._entries.pop(table).size
+            self._version += 1
+
+    def refresh_expired(self):
+        """Reload every cached table whose TTL has passed. Returns the names refreshed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [name for name, entry in self._entries.items() if now >= entry.expires_at]
+        if not expired:
+            return []
+
+        data, errors = fetch_all_tables(expired)
+        for table, error in errors.items():
+            print(f"Background refresh failed for {table}: {error}")
+            self._postpone(table, now + self.refresh_interval)
+        for table, rows in data.items():
+            self._store(table, rows, touch=False)
+        return list(data)
+
+    def _postpone(self, table, expires_at):
+        # Keep serving the stale rows and retry on a later pass instead of every request
+        with self._lock:
+            entry = self._entries.get(table)
+            if entry is not None:
+                entry.expires_at = expires_at
+
+    def _store(self, table, rows, touch=True):
+        """Cache the rows of `table`; returns False when the table is too large to cache."""
+        encoded = json.dumps(rows, default=str, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha1(encoded).hexdigest()
+        size = len(encoded)
+        expires_at = time.monotonic() + self.ttl_for(table)
+
+        with self._lock:
+            previous = self._entries.get(table)
+            if previous is not None and previous.digest == digest:
+                version = previous.version
+            else:
+                self._version += 1
+                version = self._version
+
+            if size > self.max_bytes:
+                print(f"Table {table} ({size} bytes) exceeds the catalog budget; leaving it out until its TTL passes")
+                if previous is not None:
+                    self._bytes -= self._entries.pop(table).size
+                # Refetching it for every message would cost a full dump each time
+                self._oversized[table] = expires_at
+                return False
+            self._oversized.pop(table, None)
+
+            # Assigning to an existing key keeps its LRU position, so background
+            # refreshes do not make a table look recently used
+            self._entries[table] = _Entry(rows, size, digest, expires_at, version)
+            self._bytes += size - (previous.size if previous is not None else 0)
+            if touch:
+                self._entries.move_to_end(table)
+            self._evict()
+        return True
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+
+    def _ensure_refresher(self):
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        with self._lock:
+            if self._refresher is None or not self._refresher.is_alive():
+                self._refresher = threading.Thread(target=self._refresh_loop, name="catalog-refresh", daemon=True)
+                self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            self._wakeup.wait(self.refresh_interval)
+            self._wakeup.clear()
+            try:
+                self.refresh_expired()
+            except Exception as e:
+                print(f"Catalog refresh error: {e}")
@@ -0,0 +1,131 @@
+import os
+import glob
+import time
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from data.metrics import cache_event, stage_duration
+from data.paths import CACHE_DIR
+
+CHART_CACHE_DIR = os.environ.get("CHART_CACHE_DIR", os.path.join(CACHE_DIR, "charts"))
+# matplotlib rendering is CPU-bound, so it runs in separate processes
+CHART_RENDER_WORKERS = int(os.environ.get("CHART_RENDER_WORKERS", "2"))
+# Longest a request waits for a chart that is still being rendered
+CHART_RENDER_TIMEOUT = float(os.environ.get("CHART_RENDER_TIMEOUT", "60"))
+# Rendered images kept on disk; the least recently written are removed first
+CHART_CACHE_MAX_FILES = int(os.environ.get("CHART_CACHE_MAX_FILES", "200"))
+
+CHART_FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+# The chart only needs the totals and ratios, which keeps the data sent to a worker small
+_CHART_FIELDS = {"total_asset", "total_liability", "total_equity", "net_income", "ratios"}
+
+def _render(records, fmt, highlight):
+    # Runs in a worker process; matplotlib is only imported there
+    from data.visualization import render_financial_briefing
+    return render_financial_briefing(records, fmt=fmt, highlight=highlight)
+
+class ChartRenderer:
+    """
+    Renders the financial briefing figure in a process pool and keeps the
+    images on disk, one file per data version, highlighted date and format.
+    Concurrent requests for the same image share one render.
+    """
+
+    def __init__(self, directory=CHART_CACHE_DIR, max_workers=CHART_RENDER_WORKERS, max_files=CHART_CACHE_MAX_FILES):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.max_files = max_files
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def path(self, version, highlight, fmt):
+        name = f"{version}-{highlight or 'all'}.{fmt}"
+        return os.path.join(self.directory, name.replace(os.sep, "_").replace(":", "_"))
+
+    def _get_pool(self):
+        if self._pool is None:
+            # Forking a multi-threaded server is unsafe; start clean interpreters instead
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def submit(self, balance_sheets, version, highlight=None, fmt="png"):
+        """
+        Start rendering unless the image is cached or already being rendered.
+        Returns a future resolving to the image path once the file is written.
+        """
+        path = self.path(version, highlight, fmt)
+        with self._lock:
+            future = self._pending.get(path)
+            if future is not None:
+                cache_event("charts", "pending")
+                return future
+            future = Future()
+            if os.path.exists(path):
+                cache_event("charts", "hit")
+                future.set_result(path)
+                return future
+            cache_event("charts", "miss")
+            started = time.perf_counter()
+            records = balance_sheets.to_records(_CHART_FIELDS)
+            try:
+                rendering = self._get_pool().submit(_render, records, fmt, highlight)
+            except BrokenProcessPool:
+                self._pool = None
+                rendering = self._get_pool().submit(_render, records, fmt, highlight)
+            self._pending[path] = future
+
+        def store(done):
+            try:
+                self._write(path, done.result())
+            except Exception as e:
+                print(f"Error rendering chart {path}: {e}")
+                future.set_exception(e)
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died; start a fresh pool on the next render
+                    with self._lock:
+                        self._pool = None
+            else:
+                stage_duration.observe(time.perf_counter() - started, stage="chart_render", format=fmt)
+                future.set_result(path)
+            finally:
+                with self._lock:
+                    self._pending.pop(path, None)
+
+        rendering.add_done_callback(store)
+        return future
+
+    def render(self, balance_sheets, version, highlight=None, fmt="png", timeout=CHART_RENDER_TIMEOUT):
+        """Return the path of the rendered image, rendering it first if needed."""
+        future = self.submit(balance_sheets, version, highlight, fmt)
+        return future.result(timeout=timeout)
+
+    def _write(self, path, image):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".chart-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(image)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._prune()
+
+    def _prune(self):
+        files = [path for ext in CHART_FORMATS for path in glob.glob(os.path.join(self.directory, f"*.{ext}"))]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+chart_renderer = ChartRenderer()
@@ -1,69 +1,118 @@
 import sys
-import os
-import json
-import openai
-from openai import OpenAI
-from dotenv import load_dotenv
-from get_all_tables import get_all_tables, fetch_table_data
+from data.clients import complete, stream_completion
+from data.catalog_cache import CatalogCache
+from data.table_router import TableRouter
+from data.context_packer import build_summaries, build_row_indexes, pack_context
+from data.metrics import span, counter
+
+# Shared across requests so /api/chat does not reload every table per message
+_catalog_cache = CatalogCache()
+# (catalog version, table names, router, table summaries, row indexes); rebuilt only when the catalog changes
+_catalog_indexes = (None, None, None, None, None)
+
+_CHAT_MODEL = "gpt-4o"
+_routing_decisions = counter("chat_routing_total", "Chat questions routed locally or by the LLM.")
+
+class CatalogUnavailable(Exception):
+    """No tables could be loaded (Supabase is down, or every table failed, timed out or is too large)."""
 
 def load_data():
-    """Fetch all table names and their corresponding data."""
-    data = {}
-    table_names = get_all_tables()
-    if not table_names:
+    """Fetch all table names and their corresponding data, served from the catalog cache."""
+    data = _catalog_cache.get_catalog()
+    if not data:
         print("No tables found")
-        sys.exit(1)
-    
-    for table in table_names:
-        table_data = fetch_table_data(table)
-        if table_data is not None:
-            data[table] = table_data 
+        raise CatalogUnavailable()
     
     return data
 
+def get_catalog_version():
+    """Return a stamp that changes whenever the cached catalog contents change."""
+    return _catalog_cache.version
+
+def _get_indexes(data):
+    """
+    Return the routing index, table summaries and row indexes for `data`,
+    building them once per catalog version.
+    """
+    global _catalog_indexes
+    version, tables, router, summaries, row_indexes = _catalog_indexes
+    current = (_catalog_cache.version, tuple(data))
+    if router is None or (version, tables) != current:
+        router = TableRouter(data)
+        summaries = build_summaries(data)
+        row_indexes = build_row_indexes(data)
+        _catalog_indexes = current + (router, summaries, row_indexes)
+    return router, summaries, row_indexes
+
+def _match_table_names(data, names):
+    """Map table names returned by the LLM onto real catalog tables."""
+    lookup = {table.lower(): table for table in data}
+    matched = []
+    for name in names:
+        table = lookup.get(name.strip().strip('"\'` ').lower())
+        if table and table not in matched:
+            matched.append(table)
+    return matched
+
 def get_relevant_tables(data, user_query):
-    """Use LLM to determine which tables are relevant for answering the query."""
+    """
+    Pick the tables relevant to the query with the local routing index,
+    asking the LLM only when the local match is not confident.
+    """
+    router, _, _ = _get_indexes(data)
+    with span("chat_routing", method="local"):
+        tables, confident = router.route(user_query)
+    if confident:
+        _routing_decisions.inc(method="local")
+        return tables
+    _routing_decisions.inc(method="llm")
+
     prompt = f"""As a senior financial analyst, you have access to the following tables: {', '.join(data.keys())}. 
     The user has asked the following question: {user_query}.
     Your task is to carefully analyze the available tables and determine which ones contain relevant information to answer the user's question.
     Return only a list of table names that would be useful, formatted as follows: [table_name_1, table_name_2, ...]. 
     Do not include any explanations or additional text—only the list of relevant tables."""
     
-    response = query_llm(prompt)
-    response = response.strip("[]").split(",")
-    return [table.strip().strip('"') for table in response]
+    with span("chat_routing", method="llm"):
+        response = query_llm(prompt, purpose="chat_routing")
+    response = response.strip().strip("[]").split(",")
+    return _match_table_names(data, response) or tables
 
-def query_llm(prompt):
+def query_llm(prompt, purpose="chat_answer"):
     """Query the LLM model with the provided prompt and return the response."""
-    load_dotenv()
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-    
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a helpful professional financial analyst."},
-            {"role": "user", "content": prompt},
-        ],
-        model="gpt-4o",
-    )
+    return complete(prompt, _CHAT_MODEL, purpose).strip()
 
-    return chat_completion.choices[0].message.content.strip()
+def query_llm_stream(prompt, purpose="chat_answer"):
+    """Query the LLM model and yield the response text as it is generated."""
+    return stream_completion(prompt, _CHAT_MODEL, purpose)
 
-def generate_response(data, relevant_tables, user_query):
-    """Generate a detailed response based on relevant data tables."""
-    knowledge = {table: data[table] for table in relevant_tables if table in data}
+def _response_prompt(data, relevant_tables, user_query):
+    knowledge = [table for table in relevant_tables if table in data]
+    _, summaries, row_indexes = _get_indexes(data)
+    context = pack_context(data, summaries, row_indexes, knowledge, user_query)
     
-    prompt = f"""As a senior financial analyst, you have access to the following knowledge: {', '.join(knowledge.keys())}. 
+    return f"""As a senior financial analyst, you have access to the following knowledge: {', '.join(knowledge)}. 
+    Relevant data from these tables (summaries and matching rows):
+    {context}
     The user has asked the following question: {user_query}.
     Based on your analysis of the available data, provide a detailed response to the user's question. 
     Be sure to include specific details and insights from the relevant tables to support your analysis. 
     Generate a paragraph-style response that is clear, concise, and informative."""
-    
-    response = query_llm(prompt)
+
+def generate_response(data, relevant_tables, user_query):
+    """Generate a detailed response based on relevant data tables."""
+    response = query_llm(_response_prompt(data, relevant_tables, user_query))
     return response
 
+def generate_response_stream(data, relevant_tables, user_query):
+    """Streaming version of generate_response; yields the answer in pieces."""
+    return query_llm_stream(_response_prompt(data, relevant_tables, user_query))
+
 def main():
-    data = load_data()
+    try:
+        data = load_data()
+    except CatalogUnavailable:
+        sys.exit(1)
     user_query = input("Enter a query: ")
     relevant_tables = get_relevant_tables(data, user_query)
     response = generate_response(data, relevant_tables, user_query)
@@ -0,0 +1,190 @@
+import os
+import time
+import random
+import threading
+import httpx
+from dotenv import load_dotenv
+from data.metrics import span, record_completion, record_stream
+from data.executor import IO_MAX_WORKERS, ANALYSIS_PREGENERATE_WORKERS, TABLE_LOADER_WORKERS, MAX_CONCURRENT_REFRESHES
+
+load_dotenv()
+
+# Supabase connections. By default one per thread that can be querying at once: the
+# table loaders (TABLE_LOADER_WORKERS), the balance sheet refreshes
+# (BALANCE_SHEETS_MAX_CONCURRENT_REFRESHES) and one for the table-names RPC. A smaller
+# pool makes extra queries queue for a connection until SUPABASE_TIMEOUT.
+CLIENT_POOL_SIZE = int(os.environ.get("CLIENT_POOL_SIZE", str(TABLE_LOADER_WORKERS + MAX_CONCURRENT_REFRESHES + 1)))
+# OpenAI connections. By default one per thread that can be waiting on a completion:
+# the I/O executor's workers (IO_MAX_WORKERS) plus the analysis pre-generation workers
+# (ANALYSIS_PREGENERATE_WORKERS). A smaller pool makes extra completions queue for a
+# connection until OPENAI_TIMEOUT and then fail with PoolTimeout.
+OPENAI_POOL_SIZE = int(os.environ.get("OPENAI_POOL_SIZE", str(IO_MAX_WORKERS + ANALYSIS_PREGENERATE_WORKERS)))
+# Idle keep-alive connections are closed after this many seconds
+CLIENT_KEEPALIVE_EXPIRY = float(os.environ.get("CLIENT_KEEPALIVE_EXPIRY", "60"))
+# Per-request timeout (seconds) for PostgREST calls made through the shared client
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", "10"))
+# Completions can take a while; the connect timeout stays short
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", "120"))
+OPENAI_CONNECT_TIMEOUT = float(os.environ.get("OPENAI_CONNECT_TIMEOUT", "10"))
+# Retries for transient failures (connection errors, timeouts, 429 and 5xx responses)
+CLIENT_MAX_RETRIES = int(os.environ.get("CLIENT_MAX_RETRIES", "3"))
+CLIENT_RETRY_BACKOFF = float(os.environ.get("CLIENT_RETRY_BACKOFF", "0.5"))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _pool_limits(size=CLIENT_POOL_SIZE):
+    return httpx.Limits(
+        max_connections=size,
+        max_keepalive_connections=size,
+        keepalive_expiry=CLIENT_KEEPALIVE_EXPIRY
+    )
+
+def _get_or_create(name, factory):
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = factory()
+            if client is not None:
+                _clients[name] = client
+    return client
+
+def _create_openai_client():
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        # The OpenAI client retries 408/409/429/5xx and connection errors with exponential backoff
+        max_retries=CLIENT_MAX_RETRIES,
+        http_client=httpx.Client(limits=_pool_limits(OPENAI_POOL_SIZE)),
+    )
+
+def _create_supabase_client():
+    from supabase import create_client
+    from supabase.lib.client_options import ClientOptions
+
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_key = os.environ.get("SUPABASE_KEY")
+
+    if not supabase_url or not supabase_key:
+        print("Error: Missing Supabase credentials in environment variables")
+        return None
+
+    client = create_client(
+        supabase_url,
+        supabase_key,
+        options=ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT)
+    )
+
+    # postgrest builds its session with httpx defaults; swap in one with our pool limits
+    session = client.postgrest.session
+    client.postgrest.session = type(session)(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=session.timeout,
+        limits=_pool_limits()
+    )
+    session.close()
+    return client
+
+def get_openai_client():
+    """Process-wide OpenAI client; safe to share across worker threads."""
+    return _get_or_create("openai", _create_openai_client)
+
+def get_supabase_client():
+    """
+    Process-wide Supabase client, or None when credentials are missing.
+    Its HTTP session keeps connections alive, so queries skip the TLS handshake.
+    """
+    return _get_or_create("supabase", _create_supabase_client)
+
+# PostgREST's own codes for a database it couldn't reach or get a connection from (HTTP 503/504)
+_TRANSIENT_PGRST_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+# PostgreSQL SQLSTATEs worth retrying: connection exceptions, insufficient resources,
+# serialization failures and deadlocks, and a server shutting down or starting up
+_TRANSIENT_SQLSTATES = ("08", "53", "40001", "40P01", "57P01", "57P02", "57P03")
+
+# System message of every chat completion the app makes
+_SYSTEM_PROMPT = "You are a helpful professional financial analyst."
+
+def _messages(prompt):
+    return [
+        {"role": "system", "content": _SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+def complete(prompt, model, purpose):
+    """Return the reply to `prompt` from one chat completion, recording its latency and tokens under `purpose`."""
+    client = get_openai_client()
+    with span("llm_call", purpose=purpose):
+        chat_completion = client.chat.completions.create(messages=_messages(prompt), model=model)
+    record_completion(purpose, model, chat_completion)
+    return chat_completion.choices[0].message.content
+
+def stream_completion(prompt, model, purpose):
+    """Like complete, but yield the reply piece by piece as it is generated."""
+    client = get_openai_client()
+    parts = []
+    with span("llm_stream", purpose=purpose):
+        stream = client.chat.completions.create(messages=_messages(prompt), model=model, stream=True)
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Drops the connection when the consumer stops early, which ends the generation
+            _close_stream(stream)
+    record_stream(purpose, model, prompt, "".join(parts))
+
+def _close_stream(stream):
+    # openai's Stream has no close(); closing its HTTP response is what ends it
+    response = getattr(stream, "response", None)
+    if response is not None:
+        response.close()
+    elif hasattr(stream, "close"):
+        stream.close()
+
+def _http_status(error):
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        # postgrest puts the HTTP status in `code` (as an int) when the error body isn't JSON
+        code = getattr(error, "code", None)
+        if isinstance(code, int):
+            status = code
+    return status
+
+def _is_transient(error):
+    if isinstance(error, httpx.TransportError):
+        return True
+    status = _http_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    # Otherwise `code` is a PostgREST code or a SQLSTATE, never an HTTP status
+    code = getattr(error, "code", None)
+    if isinstance(code, str):
+        return code.startswith(_TRANSIENT_PGRST_CODES) or code.startswith(_TRANSIENT_SQLSTATES)
+    return False
+
+def with_retries(func, *args, attempts=None, deadline=None, **kwargs):
+    """
+    Call `func`, retrying transient failures with exponential backoff and jitter.
+    Anything that is not a connection error, timeout, 429 or 5xx (or the PostgREST and
+    SQLSTATE codes for an unavailable database) is raised at once. No retry starts
+    after `deadline` (a `time.monotonic()` value), if one is given.
+    """
+    attempts = attempts if attempts is not None else CLIENT_MAX_RETRIES + 1
+    for attempt in range(attempts):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == attempts - 1 or not _is_transient(e):
+                raise
+            delay = CLIENT_RETRY_BACKOFF * 2 ** attempt
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            time.sleep(delay + random.uniform(0, delay / 2))
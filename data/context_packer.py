@@ -0,0 +1,148 @@
+import os
+import json
+from collections import Counter, defaultdict
+from datetime import datetime
+from data.table_router import tokenize
+
+# Approximate number of prompt tokens the packed table context may use
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.environ.get("CHAT_CONTEXT_TOKEN_BUDGET", "3000"))
+# Most query-relevant rows included per table once its summary fits
+CHAT_CONTEXT_TOP_K = int(os.environ.get("CHAT_CONTEXT_TOP_K", "10"))
+# Latest periods listed in each table summary
+CHAT_CONTEXT_RECENT_ROWS = int(os.environ.get("CHAT_CONTEXT_RECENT_ROWS", "3"))
+# Nested values (e.g. report_json) are cut to this many characters
+_MAX_VALUE_CHARS = 200
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text):
+        return len(_encoding.encode(text))
+except ImportError:
+    def count_tokens(text):
+        # Roughly four characters per token for English text and JSON
+        return len(text) // 4 + 1
+
+def _compact_value(value):
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, default=str, separators=(",", ":"))
+    if isinstance(value, str) and len(value) > _MAX_VALUE_CHARS:
+        return value[:_MAX_VALUE_CHARS] + "..."
+    return value
+
+def _compact_row(row):
+    return {key: _compact_value(value) for key, value in row.items()}
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _date_column(columns, rows):
+    for column in columns:
+        if "date" in column.lower() or column.lower() in ("created_at", "updated_at", "period"):
+            value = rows[0].get(column)
+            if isinstance(value, str):
+                try:
+                    datetime.fromisoformat(value)
+                    return column
+                except ValueError:
+                    continue
+    return None
+
+def summarize_table(table, rows):
+    """
+    Precompute a compact description of one table: size, columns, numeric
+    aggregates and the most recent periods when the table has a date column.
+    """
+    rows = [row for row in rows if isinstance(row, dict)] if isinstance(rows, list) else []
+    columns = list(rows[0].keys()) if rows else []
+    summary = {"table": table, "row_count": len(rows), "columns": columns}
+
+    aggregates = {}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        numbers = [value for value in values if _is_number(value)]
+        if numbers and len(numbers) >= len(values) // 2:
+            aggregates[column] = {
+                "min": min(numbers),
+                "max": max(numbers),
+                "mean": round(sum(numbers) / len(numbers), 4),
+                "sum": sum(numbers)
+            }
+    if aggregates:
+        summary["aggregates"] = aggregates
+
+    date_column = _date_column(columns, rows) if rows else None
+    if date_column:
+        dated = [row for row in rows if isinstance(row.get(date_column), str)]
+        dated.sort(key=lambda row: row[date_column], reverse=True)
+        summary["date_column"] = date_column
+        summary["date_range"] = [dated[-1][date_column], dated[0][date_column]] if dated else None
+        summary["recent"] = [_compact_row(row) for row in dated[:CHAT_CONTEXT_RECENT_ROWS]]
+
+    return summary
+
+def build_summaries(catalog):
+    """Summaries for every table in the catalog; computed once per catalog version."""
+    return {table: summarize_table(table, rows) for table, rows in catalog.items()}
+
+def build_row_index(rows):
+    """Inverted index of one table: term -> positions of the rows containing it, in row order."""
+    index = defaultdict(list)
+    if not isinstance(rows, list):
+        return index
+    for position, row in enumerate(rows):
+        if not isinstance(row, dict):
+            continue
+        text = " ".join(str(value) for value in row.values() if not isinstance(value, (dict, list)))
+        for term in set(tokenize(text)):
+            index[term].append(position)
+    return index
+
+def build_row_indexes(catalog):
+    """Row indexes for every table in the catalog; computed once per catalog version like the summaries."""
+    return {table: build_row_index(rows) for table, rows in catalog.items()}
+
+def _rank_rows(rows, row_index, query_terms, top_k):
+    if not query_terms or not row_index:
+        return []
+    # Rows are ranked by how many distinct query terms they contain, then by position
+    overlap = Counter()
+    for term in query_terms:
+        overlap.update(row_index.get(term, ()))
+    ranked = sorted(overlap.items(), key=lambda item: (-item[1], item[0]))
+    return [rows[position] for position, _ in ranked[:top_k]]
+
+def pack_context(catalog, summaries, row_indexes, tables, user_query, budget=CHAT_CONTEXT_TOKEN_BUDGET,
+                 top_k=CHAT_CONTEXT_TOP_K):
+    """
+    Build the data section of the chat prompt for `tables`, staying within
+    `budget` tokens. Each table contributes its precomputed summary first;
+    the remaining budget is spent on the rows that best match the query,
+    looked up in the precomputed row indexes.
+    """
+    query_terms = set(tokenize(user_query))
+    parts = []
+    used = 0
+
+    for table in tables:
+        summary = summaries.get(table)
+        if summary is None:
+            continue
+        block = f"Table {table} summary: {json.dumps(summary, default=str, separators=(',', ':'))}"
+        cost = count_tokens(block)
+        if used + cost > budget:
+            continue
+        parts.append(block)
+        used += cost
+
+    for table in tables:
+        for row in _rank_rows(catalog.get(table), row_indexes.get(table), query_terms, top_k):
+            line = f"{table} row: {json.dumps(_compact_row(row), default=str, separators=(',', ':'))}"
+            cost = count_tokens(line)
+            if used + cost > budget:
+                return "\n".join(parts)
+            parts.append(line)
+            used += cost
+
+    return "\n".join(parts)
@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Concurrent LLM/database jobs; these spend their time waiting on the network, not the CPU
+IO_MAX_WORKERS = int(os.environ.get("IO_MAX_WORKERS", "24"))
+# Jobs allowed to wait for a worker before new ones are turned away
+IO_MAX_PENDING = int(os.environ.get("IO_MAX_PENDING", "24"))
+# Longest a request waits for a non-streaming job to finish
+IO_JOB_TIMEOUT = float(os.environ.get("IO_JOB_TIMEOUT", "180"))
+
+# The other thread limits live here too, so data.clients can size its connection pools from them
+# Concurrent background analysis completions (agents.analysis_scheduler)
+ANALYSIS_PREGENERATE_WORKERS = int(os.environ.get("ANALYSIS_PREGENERATE_WORKERS", "2"))
+# Upper bound on concurrent table queries sharing the Supabase connection pool (data.get_all_tables)
+TABLE_LOADER_WORKERS = int(os.environ.get("TABLE_LOADER_WORKERS", "8"))
+# At most this many entity refreshes (and their Supabase queries) run at once (app)
+MAX_CONCURRENT_REFRESHES = int(os.environ.get("BALANCE_SHEETS_MAX_CONCURRENT_REFRESHES", "4"))
+
+class ExecutorSaturated(Exception):
+    """Raised when the executor already has its maximum number of running and queued jobs."""
+
+class _Failure:
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+_STREAM_END = object()
+
+class BoundedExecutor:
+    """
+    Thread pool with a hard cap on running plus queued jobs, so slow upstream
+    calls cannot pile up without limit. Submitting past the cap raises
+    ExecutorSaturated immediately, which routes turn into a 503.
+    """
+
+    def __init__(self, max_workers=IO_MAX_WORKERS, max_pending=IO_MAX_PENDING, name="io"):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated()
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, timeout=IO_JOB_TIMEOUT, **kwargs):
+        """Run `fn` on the pool and wait for its result."""
+        return self.submit(fn, *args, **kwargs).result(timeout=timeout)
+
+    def stream(self, fn, *args, **kwargs):
+        """
+        Run the generator function `fn` on the pool and return an iterator over
+        what it yields, for use from the request thread. The job is submitted
+        before this returns, so saturation is reported before a response starts.
+        Closing the iterator (e.g. when the client disconnects) stops the job at
+        its next item and closes the generator, freeing the worker.
+        """
+        items = queue.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            generator = None
+            try:
+                generator = fn(*args, **kwargs)
+                for item in generator:
+                    if cancelled.is_set():
+                        break
+                    items.put(item)
+            except Exception as e:
+                items.put(_Failure(e))
+            finally:
+                if generator is not None:
+                    # Runs the generator's cleanup, which closes any upstream stream
+                    generator.close()
+                items.put(_STREAM_END)
+
+        self.submit(produce)
+
+        def consume():
+            try:
+                while True:
+                    item = items.get()
+                    if item is _STREAM_END:
+                        return
+                    if isinstance(item, _Failure):
+                        raise item.error
+                    yield item
+            finally:
+                # Also reached through GeneratorExit when the response is closed early
+                cancelled.set()
+
+        return consume()
+
+# Shared by the LLM- and database-bound routes
+io_executor = BoundedExecutor()
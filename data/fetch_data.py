@@ -1,27 +1,43 @@
 import os
-from supabase import create_client
 from dotenv import load_dotenv
+from data.clients import get_supabase_client, with_retries
+from data.metrics import span
 
 load_dotenv()
 
-def fetch_data_from_supabase():
+# Column used as the high-water mark for incremental syncs. "date" picks up new
+# periods; a column such as "updated_at" also catches restated periods.
+BALANCE_SHEETS_SYNC_COLUMN = os.environ.get("BALANCE_SHEETS_SYNC_COLUMN", "date")
+# Column naming the company a row belongs to; fetches for one entity filter on it
+BALANCE_SHEETS_ENTITY_COLUMN = os.environ.get("BALANCE_SHEETS_ENTITY_COLUMN", "entity_id")
+
+def fetch_data_from_supabase(since=None, entity=None):
     """
     Fetch balance sheet data directly from Supabase using the Python client.
     Replaces the Node.js subprocess approach.
+
+    When `since` is given, only rows whose BALANCE_SHEETS_SYNC_COLUMN is at or
+    after that high-water mark are returned, so a refresh transfers just the
+    periods that were added or changed. `entity` restricts the rows to one
+    company (BALANCE_SHEETS_ENTITY_COLUMN); None fetches every row.
     """
     try:
-        supabase_url = os.environ.get("SUPABASE_URL")
-        supabase_key = os.environ.get("SUPABASE_KEY")
-        
-        if not supabase_url or not supabase_key:
-            print("Error: Missing Supabase credentials in environment variables")
+        supabase = get_supabase_client()
+        if supabase is None:
             return None
-            
-        # Initialize Supabase client
-        supabase = create_client(supabase_url, supabase_key)
         
+        columns = 'date, report_json'
+        if BALANCE_SHEETS_SYNC_COLUMN != 'date':
+            columns += f', {BALANCE_SHEETS_SYNC_COLUMN}'
+
         # Fetch balance sheets with the same query as the JS version
-        response = supabase.table('accounting_balance_sheets').select('date, report_json').order('date').execute()
+        query = supabase.table('accounting_balance_sheets').select(columns)
+        if entity is not None:
+            query = query.eq(BALANCE_SHEETS_ENTITY_COLUMN, entity)
+        if since is not None:
+            query = query.gte(BALANCE_SHEETS_SYNC_COLUMN, since)
+        with span("supabase_fetch", table="accounting_balance_sheets", mode="full" if since is None else "incremental"):
+            response = with_retries(query.order('date').execute)
         
         if hasattr(response, 'error') and response.error:
             print(f"Error fetching data from Supabase: {response.error}")
@@ -36,3 +52,11 @@ def fetch_data_from_supabase():
         print(f"Error connecting to Supabase: {e}")
         return None
 
+def sync_high_water_mark(rows, current=None):
+    """Return the largest sync-column value seen in `rows`, starting from `current`."""
+    mark = current
+    for row in rows:
+        value = row.get(BALANCE_SHEETS_SYNC_COLUMN)
+        if value is not None and (mark is None or str(value) > str(mark)):
+            mark = value
+    return mark
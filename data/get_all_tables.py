@@ -1,62 +1,98 @@
-import subprocess
-import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from data.clients import get_supabase_client, with_retries, SUPABASE_TIMEOUT
+from data.metrics import span
+from data.executor import TABLE_LOADER_WORKERS
+
+_loader_pool = ThreadPoolExecutor(max_workers=TABLE_LOADER_WORKERS, thread_name_prefix="table-loader")
 
 def get_all_tables():
+    """Return the list of table names exposed by the `get_table_names` RPC."""
     try:
-        result = subprocess.run(
-            ['node', 'get_all_tables.js'],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        supabase = get_supabase_client()
+        if supabase is None:
+            return None
 
-        raw_output = result.stdout.strip()
-        data = json.loads(raw_output)
+        with span("supabase_fetch", table="get_table_names"):
+            response = with_retries(supabase.rpc('get_table_names', {}).execute)
+        data = response.data
 
         if not isinstance(data, list):
-            print("Unexpected response format for table names:", raw_output)
+            print("Unexpected response format for table names:", data)
             return None
 
-        return data
+        return [row["tablename"] if isinstance(row, dict) else row for row in data]
 
-    except subprocess.CalledProcessError as e:
-        print("Error running the JavaScript file:", e)
-        print("Stderr:", e.stderr)
-        return None
-    except json.JSONDecodeError as e:
-        print("Error parsing JSON:", e)
-        print("Raw JSON Response:", result.stdout)
+    except Exception as e:
+        print("Error fetching table names from Supabase:", e)
         return None
 
+def _select_all(table_name, deadline=None):
+    supabase = get_supabase_client()
+    if supabase is None:
+        raise RuntimeError("Supabase client is not configured")
+    # Labelled as catalog rather than per table to keep the series count fixed
+    with span("supabase_fetch", table="catalog"):
+        response = with_retries(supabase.table(table_name).select('*').execute, deadline=deadline)
+    return response.data
 
+def _timed_select(table_name, timeout, started):
+    # The budget starts when a worker picks the table up, not when it is queued
+    started[table_name] = time.monotonic()
+    return _select_all(table_name, deadline=started[table_name] + timeout)
 
 def fetch_table_data(table_name):
+    """Fetch every row of a single table, keyed by table name like the old JS helper."""
     try:
         if not isinstance(table_name, str):
             print("Error: table_name must be a string.")
             return None
 
-        result = subprocess.run(
-            ['node', os.path.join(os.getcwd(), 'fetchAllData.js'), table_name.strip()],  
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        table_name = table_name.strip()
+        return {table_name: _select_all(table_name)}
 
-        raw_output = result.stdout.strip()
+    except Exception as e:
+        print(f"Error fetching data for {table_name}: {e}")
+        return None
 
-        if not raw_output:
-            print(f"Error: JavaScript returned empty response for {table_name}.")
-            return None
-        
-        return json.loads(raw_output)
+def fetch_all_tables(table_names, timeout=SUPABASE_TIMEOUT):
+    """
+    Fetch several tables concurrently over the shared Supabase client.
 
-    except subprocess.CalledProcessError as e:
-        print(f"Error running JavaScript file: {e}")
-        print(f"Stderr: {e.stderr}")
-        return None
-    except json.JSONDecodeError as e:
-        print("Error parsing JSON:", e)
-        print("Raw JSON Response:", raw_output)
-        return None
+    Each table is one query on the bounded loader pool, and `timeout` is the
+    per-table budget counted from when a worker starts on it; no retry is
+    started after it runs out. A query still running at that point cannot be
+    aborted, so the table is reported as timed out and its result dropped.
+    Returns a `(data, errors)` pair where `data` maps table name to its rows
+    and `errors` maps the tables that failed or timed out to a short message,
+    so callers can still use a partial catalog.
+    """
+    data = {}
+    errors = {}
+    names = [name.strip() for name in table_names if isinstance(name, str)]
+    if not names:
+        return data, errors
+
+    started = {}
+    futures = {_loader_pool.submit(_timed_select, name, timeout, started): name for name in names}
+    pending = set(futures)
+    while pending:
+        now = time.monotonic()
+        for future in [f for f in pending if futures[f] in started and now - started[futures[f]] >= timeout]:
+            if not future.done():
+                pending.discard(future)
+                errors[futures[future]] = f"timed out after {timeout:.1f}s"
+        if not pending:
+            break
+        # Wake up for the next completion or the earliest budget to run out
+        budgets = [started[futures[f]] + timeout - now for f in pending if futures[f] in started]
+        done, pending = wait(pending, timeout=min(budgets, default=timeout), return_when=FIRST_COMPLETED)
+        for future in done:
+            name = futures[future]
+            try:
+                data[name] = future.result()
+            except Exception as e:
+                errors[name] = str(e)
+
+    return data, errors
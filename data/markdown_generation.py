@@ -1,60 +1,56 @@
-def generate_markdown(data):
+from datetime import datetime
+from html import escape
+
+def _format_date(date_str):
     # Format the date from ISO format to a more readable format
-    date_str = data['date']
     try:
-        # Parse the ISO date and reformat it
-        from datetime import datetime
         date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        formatted_date = date_obj.strftime('%B %d, %Y')  # Example: "December 31, 2024"
-    except:
+        return date_obj.strftime('%B %d, %Y')  # Example: "December 31, 2024"
+    except (AttributeError, TypeError, ValueError):
         # Fallback if date parsing fails
-        formatted_date = date_str
-
-    markdown = f"""
-# Financial Report
-
-**Date:** {formatted_date}
-
-## Assets
-**Total Assets:** ${data['total_asset']:,.2f}
-
-### Breakdown
-"""
-    for asset in data["asset_breakdown"]:
-        markdown += f"- **{asset['name']}:** ${asset['value']:,.2f}\n"
+        return date_str
 
-    markdown += f"""
+def _money(value):
+    return "N/A" if value is None else f"${value:,.2f}"
 
-## Liabilities
-**Total Liabilities:** ${data['total_liability']:,.2f}
+def _ratio(value):
+    return "N/A" if value is None else f"{value:.2f}"
 
-### Breakdown
-"""
-    for liability in data["liability_breakdown"]:
-        markdown += f"- **{liability['name']}:** ${liability['value']:,.2f}\n"
+def _ratio_title(ratio):
+    return ratio.replace('_', ' ').title()
 
-    markdown += f"""
+_SECTIONS = (
+    ("Assets", "Total Assets", "total_asset", "asset_breakdown"),
+    ("Liabilities", "Total Liabilities", "total_liability", "liability_breakdown"),
+    ("Equity", "Total Equity", "total_equity", "equity_breakdown"),
+)
 
-## Equity
-**Total Equity:** ${data['total_equity']:,.2f}
-
-### Breakdown
-"""
-    for equity in data["equity_breakdown"]:
-        if equity['value'] is not None:  # Check for None values
-            markdown += f"- **{equity['name']}:** ${equity['value']:,.2f}\n"
-        else:
-            markdown += f"- **{equity['name']}:** N/A\n"
-
-    markdown += f"""
-
-## Net Income
-**Net Income:** ${data['net_income']:,.2f}
-
-## Ratios
-"""
-    for ratio, value in data["ratios"].items():
-        # Format ratio values to 2 decimal places
-        markdown += f"- **{ratio.replace('_', ' ').title()}:** {value:.2f}\n"
-
-    return markdown
+def generate_markdown(data):
+    parts = ["\n# Financial Report\n\n**Date:** ", str(_format_date(data['date'])), "\n"]
+    for i, (heading, label, total_key, breakdown_key) in enumerate(_SECTIONS):
+        parts.append("\n\n" if i else "\n")
+        parts.append(f"## {heading}\n**{label}:** {_money(data[total_key])}\n\n### Breakdown\n")
+        parts.extend(f"- **{item['name']}:** {_money(item['value'])}\n" for item in data[breakdown_key])
+
+    parts.append(f"\n\n## Net Income\n**Net Income:** {_money(data['net_income'])}\n\n## Ratios\n")
+    # Format ratio values to 2 decimal places
+    parts.extend(f"- **{_ratio_title(ratio)}:** {_ratio(value)}\n" for ratio, value in data["ratios"].items())
+    return "".join(parts)
+
+def generate_html(data):
+    """The same report as generate_markdown, as an HTML fragment for server-side rendering."""
+    parts = ["<h1>Financial Report</h1>\n",
+             f"<p><strong>Date:</strong> {escape(str(_format_date(data['date'])))}</p>\n"]
+    for heading, label, total_key, breakdown_key in _SECTIONS:
+        parts.append(f"<h2>{heading}</h2>\n<p><strong>{label}:</strong> {_money(data[total_key])}</p>\n"
+                     "<h3>Breakdown</h3>\n<ul>\n")
+        parts.extend(f"<li><strong>{escape(str(item['name']))}:</strong> {_money(item['value'])}</li>\n"
+                     for item in data[breakdown_key])
+        parts.append("</ul>\n")
+
+    parts.append(f"<h2>Net Income</h2>\n<p><strong>Net Income:</strong> {_money(data['net_income'])}</p>\n"
+                 "<h2>Ratios</h2>\n<ul>\n")
+    parts.extend(f"<li><strong>{_ratio_title(ratio)}:</strong> {_ratio(value)}</li>\n"
+                 for ratio, value in data["ratios"].items())
+    parts.append("</ul>\n")
+    return "".join(parts)
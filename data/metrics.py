@@ -0,0 +1,170 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# Prefix for every exported metric name
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "reflash")
+
+# Latency buckets (seconds) wide enough for both cache lookups and LLM completions
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items)
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # label key -> [bucket counts..., count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(round(series[-1], 6))}")
+        return lines
+
+class Gauge:
+    """Value read from a callback when metrics are scraped."""
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self):
+        try:
+            value = self.read()
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+            return []
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(value)}"]
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+def _metric(kind, name, help_text, *args):
+    full_name = f"{METRICS_NAMESPACE}_{name}"
+    metric = _registry.get(full_name)
+    if metric is None:
+        with _registry_lock:
+            metric = _registry.get(full_name)
+            if metric is None:
+                metric = _registry[full_name] = kind(full_name, help_text, *args)
+    return metric
+
+def counter(name, help_text):
+    return _metric(Counter, name, help_text)
+
+def histogram(name, help_text, buckets=_BUCKETS):
+    return _metric(Histogram, name, help_text, buckets)
+
+def gauge(name, help_text, read):
+    return _metric(Gauge, name, help_text, read)
+
+stage_duration = histogram("stage_duration_seconds", "Time spent in each processing stage.")
+stage_errors = counter("stage_errors_total", "Stages that ended with an exception.")
+cache_events = counter("cache_events_total", "Cache lookups by cache and result (hit, miss or stale).")
+llm_requests = counter("llm_requests_total", "LLM calls by purpose and model.")
+llm_tokens = counter("llm_tokens_total", "LLM tokens by purpose, model and kind (prompt or completion).")
+request_duration = histogram("http_request_duration_seconds", "HTTP request latency by endpoint, method and status.")
+
+@contextmanager
+def span(stage, **labels):
+    """Time the enclosed block as `stage`; exceptions are counted and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        stage_errors.inc(stage=stage, **labels)
+        raise
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage=stage, **labels)
+
+def cache_event(cache, result):
+    cache_events.inc(cache=cache, result=result)
+
+def record_llm_usage(purpose, model, prompt_tokens, completion_tokens):
+    llm_requests.inc(purpose=purpose, model=model)
+    if prompt_tokens:
+        llm_tokens.inc(prompt_tokens, purpose=purpose, model=model, kind="prompt")
+    if completion_tokens:
+        llm_tokens.inc(completion_tokens, purpose=purpose, model=model, kind="completion")
+
+def record_completion(purpose, model, completion):
+    """Count the tokens reported in a chat completion's `usage`."""
+    usage = getattr(completion, "usage", None)
+    record_llm_usage(purpose, model, getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0))
+
+def record_stream(purpose, model, prompt, text):
+    """Streamed completions carry no usage here, so their tokens are counted locally."""
+    from data.context_packer import count_tokens
+    record_llm_usage(purpose, model, count_tokens(prompt), count_tokens(text) if text else 0)
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = [_registry[name] for name in sorted(_registry)]
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,4 @@
+import os
+
+# Directory for on-disk caches; point it at a persistent volume in production
+CACHE_DIR = os.environ.get("CACHE_DIR", ".cache")
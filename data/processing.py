@@ -1,69 +1,168 @@
+import sys
 from datetime import datetime
+import numpy as np
+from data.balance_frame import BalanceSheetFrame
+from data.metrics import span
+
 def balance_briefing(data_accounting_balance_sheets, output_file=None):
-    output_data = []
-
-    for balance_sheet in data_accounting_balance_sheets:
-        date = balance_sheet.get("date")
-        report_json = balance_sheet.get("report_json")
-
-        assets = report_json.get("assets", [{}])[0]
-        liabilities = report_json.get("liabilities", [{}])[0]
-        equity = report_json.get("equity", [{}])[0]
-
-        asset_sub = [{"name": item.get("name"), "value": item.get("value")} 
-                     for item in assets.get("sub_items", [])]
-        liability_sub = [{"name": item.get("name"), "value": item.get("value")} 
-                         for item in liabilities.get("sub_items", [])]
-        equity_sub = [{"name": item.get("name"), "value": item.get("value")} 
-                      for item in equity.get("sub_items", [])]
-
-        total_assets = assets.get("value") or 1
-        total_liabilities = liabilities.get("value") or 1
-        total_equity = equity.get("value") or 1
-
-        net_income = next((item.get("value") for item in equity.get("sub_items", []) 
-                          if item.get("name") == "Net Income"), 0)
-
-        ratios = {
-            "current_ratio": total_assets / total_liabilities,
-            "debt_to_equity_ratio": total_liabilities / total_equity,
-            "return_on_equity": net_income / total_equity,
-            "equity_multiplier": total_assets / total_equity,
-            "debt_ratio": total_liabilities / total_assets,
-            "net_profit_margin": net_income / total_assets
-        }
-
-        output_data.append({
-            "date": date,
-            "total_asset": total_assets,
-            "asset_breakdown": asset_sub,
-            "total_liability": total_liabilities,
-            "liability_breakdown": liability_sub,
-            "total_equity": total_equity,
-            "equity_breakdown": equity_sub,
-            "net_income": net_income,
-            "ratios": ratios
-        })
+    """
+    Process raw `accounting_balance_sheets` rows into a BalanceSheetFrame.
+
+    The frame behaves like the list of per-date dicts this function used to
+    return, but totals and ratios are held column-wise and computed vectorized.
+    """
+    with span("balance_briefing"):
+        output_data = BalanceSheetFrame.from_reports(data_accounting_balance_sheets or [])
 
     if output_file:
         import json
         with open(output_file, "w") as f:
-            json.dump(output_data, f, indent=4)
+            json.dump(output_data.to_records(), f, indent=4)
         print(f"Balance sheet data has been written to {output_file}")
 
     return output_data
 
-def financial_summary(balance_sheets, target_date):
-    nearest_date = None
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+class DateIndex:
+    """
+    Sorted index over the dates of a list of processed balance sheets.
+
+    Dates are parsed once when the index is built and kept as a sorted
+    datetime64 array; exact, nearest and range lookups are then binary
+    searches. Passing the previous index lets a rebuild after an incremental
+    sync reuse the dates it already parsed.
+    """
+
+    def __init__(self, balance_sheets, previous=None):
+        self.sheets = balance_sheets
+        parsed = previous._parsed if previous is not None else {}
+        self._parsed = {}
+        if isinstance(balance_sheets, BalanceSheetFrame):
+            date_strs = balance_sheets.dates
+        else:
+            date_strs = [sheet['date'] for sheet in balance_sheets]
+        dates = []
+        for date_str in date_strs:
+            date = parsed.get(date_str)
+            if date is None:
+                date = _parse_date(date_str)
+            self._parsed[date_str] = date
+            dates.append(date)
+        keys = np.array(dates, dtype="datetime64[us]")
+        # Already sorted in the common case, which makes this linear
+        self.positions = np.argsort(keys, kind="stable")
+        self.keys = keys[self.positions]
+
+    @classmethod
+    def from_arrays(cls, balance_sheets, keys, positions):
+        """Rebuild an index from previously saved sorted keys and positions without parsing dates."""
+        index = cls.__new__(cls)
+        index.sheets = balance_sheets
+        index._parsed = {}
+        index.keys = keys
+        index.positions = positions
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        """Memory held by the sorted arrays and the parsed-date map (its keys are the frame's date strings)."""
+        return (self.keys.nbytes + self.positions.nbytes + sys.getsizeof(self._parsed)
+                + sum(map(sys.getsizeof, self._parsed.values())))
+
+    def _search(self, date, side="left"):
+        return int(np.searchsorted(self.keys, np.datetime64(_parse_date(date), "us"), side=side))
+
+    def exact(self, target_date):
+        """Return the sheet dated exactly `target_date`, or None."""
+        target = np.datetime64(_parse_date(target_date), "us")
+        i = self._search(target_date)
+        if i < len(self.keys) and self.keys[i] == target:
+            return self.sheets[int(self.positions[i])]
+        return None
+
+    def nearest(self, target_date):
+        """Return the sheet closest to `target_date`; ties go to the earlier date."""
+        if not len(self.keys):
+            return None
+        target = np.datetime64(_parse_date(target_date), "us")
+        i = self._search(target_date)
+        if i == len(self.keys):
+            i -= 1
+        elif i > 0 and target - self.keys[i - 1] <= self.keys[i] - target:
+            i -= 1
+        return self.sheets[int(self.positions[i])]
+
+    def span(self, start=None, end=None, after=None):
+        """
+        Return the `(lo, hi)` bounds in sorted order of the dates within
+        [start, end]. `after` is a cursor from `cursor()`, used to resume a
+        paginated listing right after the last period already returned.
+        """
+        lo = self._search(start) if start is not None else 0
+        if after is not None:
+            lo = max(lo, self._resume(after))
+        hi = self._search(end, side="right") if end is not None else len(self.keys)
+        return lo, max(lo, hi)
+
+    def cursor(self, end):
+        """
+        Cursor for a listing that stopped before sorted position `end`: the
+        date of the last period returned and how many periods with that date
+        were returned, so periods sharing a date are not skipped on resume.
+        """
+        date = self.sheets.dates[int(self.positions[end - 1])]
+        return f"{date}~{end - self._search(date)}"
+
+    def _resume(self, cursor):
+        date, sep, count = cursor.rpartition("~")
+        if not sep:
+            # A bare date resumes after every period with that date
+            return self._search(cursor, side="right")
+        if not count.isdigit():
+            raise ValueError(f"invalid cursor: {cursor}")
+        return self._search(date) + int(count)
+
+    def between(self, start=None, end=None):
+        """Return the sheets dated within [start, end] in date order; either bound may be None."""
+        lo, hi = self.span(start, end)
+        return [self.sheets[position] for position in self.positions[lo:hi].tolist()]
+
+def financial_summary(balance_sheets, target_date, date_index=None):
+    """Return the sheet for `target_date`, or the one nearest to it."""
+    with span("summary_lookup"):
+        if date_index is None or date_index.sheets is not balance_sheets:
+            date_index = DateIndex(balance_sheets)
+        return date_index.nearest(target_date)
+
+def merge_balance_sheets(balance_sheets, updates):
+    """
+    Merge newly processed sheets into a frame already sorted by date.
+
+    A sheet in `updates` replaces any existing sheet with the same date. Only the
+    tail of `balance_sheets` that overlaps the updates is re-sorted, and ratios
+    are carried over rather than recomputed, so the cost follows the number of
+    changed periods rather than the length of the history. Returns a new frame;
+    `balance_sheets` is left untouched for concurrent readers.
+    """
+    if not len(updates):
+        return balance_sheets
+
+    updates = updates.sort_by_date()
+    first_update = _parse_date(updates.dates[0])
+
+    split = len(balance_sheets)
+    while split > 0 and _parse_date(balance_sheets.dates[split - 1]) >= first_update:
+        split -= 1
 
-    target_date = datetime.fromisoformat(target_date).replace(tzinfo=None)
-    dates = [datetime.fromisoformat(sheet['date']).replace(tzinfo=None) for sheet in balance_sheets]
-    
-    if target_date in dates:
-        nearest_date = target_date
-    else:
-        nearest_date = min(dates, key=lambda x: abs(x - target_date))
-    nearest_index = dates.index(nearest_date)
-    nearest_sheet = balance_sheets[nearest_index]
+    replaced = set(updates.dates)
+    kept = [i for i in range(split, len(balance_sheets)) if balance_sheets.dates[i] not in replaced]
+    tail = balance_sheets.take(kept).concat(updates).sort_by_date()
 
-    return nearest_sheet
\ No newline at end of file
+    return balance_sheets.take(range(split)).concat(tail)
@@ -0,0 +1,67 @@
+import sys
+import time
+import threading
+from data.markdown_generation import generate_markdown, generate_html
+from data.metrics import span, cache_event
+
+class ReportStore:
+    """
+    Markdown and HTML stats reports for every period of one data version,
+    built in a single batch so that picking a date is a dictionary lookup.
+    Materializing a new version replaces the previous one. The app keeps one
+    store per entity, so entities never wait on each other's batches, and
+    only rebuilds the stores that were used recently.
+    """
+
+    def __init__(self):
+        # (version, {date: {"markdown": ..., "html": ...}}, size in bytes) swapped as one tuple
+        self._current = (None, {}, 0)
+        self._lock = threading.Lock()
+        # time.monotonic() of the last lookup or materialize; None until then
+        self._used = None
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the report texts."""
+        return self._current[2]
+
+    def used_within(self, seconds):
+        """Whether the reports were looked up or built in the last `seconds`."""
+        return self._used is not None and time.monotonic() - self._used < seconds
+
+    def clear(self):
+        """Drop the reports; the next materialize builds them again."""
+        with self._lock:
+            self._current = (None, {}, 0)
+
+    def materialize(self, balance_sheets, version):
+        """Build the reports for `version` unless they already exist; returns them keyed by date."""
+        self._used = time.monotonic()
+        current_version, reports, _ = self._current
+        if current_version == version:
+            cache_event("reports", "hit")
+            return reports
+        with self._lock:
+            current_version, reports, _ = self._current
+            if current_version == version:
+                cache_event("reports", "hit")
+                return reports
+            cache_event("reports", "miss")
+            with span("markdown_render", mode="batch"):
+                reports = {}
+                size = 0
+                for record in balance_sheets.to_records():
+                    report = {"markdown": generate_markdown(record), "html": generate_html(record)}
+                    reports[record["date"]] = report
+                    size += sys.getsizeof(report) + sys.getsizeof(report["markdown"]) + sys.getsizeof(report["html"])
+                size += sys.getsizeof(reports)
+            self._current = (version, reports, size)
+        return reports
+
+    def lookup(self, version, date, fmt="markdown"):
+        """The report for `date` if `version` is already materialized, else None; never builds."""
+        self._used = time.monotonic()
+        current_version, reports, _ = self._current
+        report = reports.get(date) if current_version == version else None
+        cache_event("reports", "miss" if report is None else "hit")
+        return report[fmt] if report is not None else None
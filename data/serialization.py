@@ -0,0 +1,94 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from data.metrics import cache_event
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj):
+    """Encode `obj` as compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+def gzip_bytes(body, level=6):
+    # mtime=0 keeps the output identical for identical input
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+class EncodedBodyCache:
+    """
+    Holds encoded (and gzip-compressed) response bodies for the most recently
+    used data versions, so repeat requests for
+    unchanged data skip serialization entirely. `variant` tells apart
+    different views of the same version (ranges, projections, pages); at
+    most `max_variants` of them are kept per version. Concurrent misses for
+    the same view wait for one request to serialize it. `nbytes` is the size
+    of the bodies held.
+    """
+
+    def __init__(self, name="body", max_variants=64, max_versions=8):
+        self.name = name
+        self.max_variants = max_variants
+        self.max_versions = max_versions
+        # version -> {variant: {encoding: body}}, least recently used first
+        self._versions = OrderedDict()
+        # (version, variant) -> event set when the request building it is done
+        self._building = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+
+    def _bodies(self, version, variant):
+        # Called with the lock held
+        variants = self._versions.get(version)
+        if variants is None:
+            variants = self._versions[version] = {}
+            while len(self._versions) > self.max_versions:
+                _, dropped = self._versions.popitem(last=False)
+                self.nbytes -= sum(len(body) for bodies in dropped.values() for body in bodies.values())
+        else:
+            self._versions.move_to_end(version)
+
+        bodies = variants.get(variant)
+        if bodies is None:
+            while len(variants) >= self.max_variants:
+                dropped = variants.pop(next(iter(variants)))
+                self.nbytes -= sum(len(body) for body in dropped.values())
+            bodies = variants[variant] = {}
+        return bodies
+
+    def get(self, version, variant, encoding, build):
+        while True:
+            with self._lock:
+                bodies = self._bodies(version, variant)
+                body = bodies.get(encoding)
+                if body is not None:
+                    cache_event(self.name, "hit")
+                    return body
+                building = self._building.get((version, variant))
+                if building is None:
+                    building = self._building[(version, variant)] = threading.Event()
+                    identity = bodies.get("identity")
+                    break
+            building.wait()
+
+        # Serialized outside the lock so other views and versions aren't held up
+        cache_event(self.name, "miss")
+        try:
+            if identity is None:
+                identity = dumps(build())
+            body = gzip_bytes(identity) if encoding == "gzip" else identity
+            with self._lock:
+                bodies = self._bodies(version, variant)
+                for name, encoded in (("identity", identity), (encoding, body)):
+                    if name not in bodies:
+                        bodies[name] = encoded
+                        self.nbytes += len(encoded)
+        finally:
+            with self._lock:
+                del self._building[(version, variant)]
+            building.set()
+        return body
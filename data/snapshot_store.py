@@ -0,0 +1,133 @@
+import os
+import json
+import mmap
+import struct
+import tempfile
+import numpy as np
+from data.balance_frame import BalanceSheetFrame, Breakdown, LINE_ITEM_NAMES, RATIO_NAMES, SECTIONS
+from data.paths import CACHE_DIR
+
+SNAPSHOT_PATH = os.environ.get("BALANCE_SHEETS_SNAPSHOT_PATH", os.path.join(CACHE_DIR, "balance_sheets.snapshot"))
+
+# File layout: magic, header length (uint64 LE), JSON header, then raw arrays,
+# each starting on a 64-byte boundary so they can be mapped straight into NumPy
+_MAGIC = b"RFSNAP01"
+_ALIGN = 64
+
+def _padding(position):
+    return -position % _ALIGN
+
+def _frame_arrays(frame, date_index):
+    arrays = {
+        "total_asset": frame.total_asset,
+        "total_liability": frame.total_liability,
+        "total_equity": frame.total_equity,
+        "net_income": frame.net_income,
+        "index_keys": date_index.keys.astype("datetime64[us]").view(np.int64),
+        "index_positions": np.asarray(date_index.positions, dtype=np.int64),
+    }
+    for name in RATIO_NAMES:
+        arrays[f"ratio.{name}"] = frame.ratios[name]
+    for section, breakdown in zip(SECTIONS, frame.breakdowns):
+        arrays[f"{section}.offsets"] = breakdown.offsets
+        arrays[f"{section}.name_ids"] = breakdown.name_ids
+        arrays[f"{section}.values"] = breakdown.values
+    return arrays
+
+def snapshot_path(entity=None):
+    """Snapshot file of one entity; None is the unscoped data set at SNAPSHOT_PATH."""
+    if entity is None:
+        return SNAPSHOT_PATH
+    return os.path.join(os.path.dirname(SNAPSHOT_PATH) or ".", "entities", f"{entity}.snapshot")
+
+def save_snapshot(frame, date_index, meta, path=SNAPSHOT_PATH):
+    """
+    Write the processed balance sheets and their date index to `path`.
+    The file is written next to the target and renamed into place, so a
+    reader never sees a partial snapshot.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in _frame_arrays(frame, date_index).items()}
+
+    specs = {}
+    offset = 0
+    for name, array in arrays.items():
+        specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes + _padding(array.nbytes)
+
+    header = json.dumps({
+        "meta": meta,
+        "dates": frame.dates,
+        "names": list(LINE_ITEM_NAMES.names),
+        "arrays": specs,
+    }).encode("utf-8")
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            f.write(b"\0" * _padding(f.tell()))
+            for array in arrays.values():
+                f.write(array.tobytes())
+                f.write(b"\0" * _padding(array.nbytes))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    """
+    Memory-map a snapshot written by save_snapshot.
+
+    Returns `(frame, keys, positions, meta)`, or None if there is no usable
+    snapshot. The numeric columns are read-only views onto the mapped file,
+    so loading costs little beyond parsing the header.
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            print(f"Ignoring snapshot with unknown format: {path}")
+            return None
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length))
+        data_start = len(_MAGIC) + 8 + header_length
+        data_start += _padding(data_start)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        arrays[name] = np.frombuffer(mapped, dtype=dtype, count=count,
+                                     offset=data_start + spec["offset"]).reshape(spec["shape"])
+
+    # Map saved line-item ids onto this process's name table
+    saved_names = header["names"]
+    remap = np.array([LINE_ITEM_NAMES.intern(name) for name in saved_names], dtype=np.int32)
+    identity = np.array_equal(remap, np.arange(len(saved_names)))
+
+    breakdowns = []
+    for section in SECTIONS:
+        name_ids = arrays[f"{section}.name_ids"]
+        if not identity and len(name_ids):
+            name_ids = remap[name_ids]
+        breakdowns.append(Breakdown(arrays[f"{section}.offsets"], name_ids, arrays[f"{section}.values"]))
+
+    frame = BalanceSheetFrame(
+        header["dates"],
+        arrays["total_asset"],
+        arrays["total_liability"],
+        arrays["total_equity"],
+        arrays["net_income"],
+        breakdowns,
+        {name: arrays[f"ratio.{name}"] for name in RATIO_NAMES},
+    )
+    keys = arrays["index_keys"].view("datetime64[us]")
+    positions = arrays["index_positions"].astype(np.intp, copy=False)
+    return frame, keys, positions, header["meta"]
@@ -0,0 +1,102 @@
+import os
+import re
+import math
+from collections import Counter, defaultdict
+
+# Minimum BM25 score of the best table for the local answer to be trusted
+TABLE_ROUTER_MIN_SCORE = float(os.environ.get("TABLE_ROUTER_MIN_SCORE", "1.0"))
+# Tables scoring at least this fraction of the best score are returned with it
+TABLE_ROUTER_RELATIVE_CUTOFF = float(os.environ.get("TABLE_ROUTER_RELATIVE_CUTOFF", "0.5"))
+# Rows per table whose text values are added to the index
+TABLE_ROUTER_SAMPLE_ROWS = int(os.environ.get("TABLE_ROUTER_SAMPLE_ROWS", "20"))
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+    a an and are as at be by can do does for from has have how i in is it its me my of on or our
+    show tell than that the their there this to us was we what when where which who why will with you your
+""".split())
+
+# Table and column names say more about a table than the values in it
+_NAME_WEIGHT = 3
+_COLUMN_WEIGHT = 2
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall(str(text).lower()):
+        if token in _STOPWORDS:
+            continue
+        # Crude singularisation so "sheets" matches "sheet" and "accounts" matches "account"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def _table_terms(table, rows):
+    terms = Counter()
+    for token in tokenize(table.replace("_", " ")):
+        terms[token] += _NAME_WEIGHT
+
+    columns = set()
+    sample = rows[:TABLE_ROUTER_SAMPLE_ROWS] if isinstance(rows, list) else []
+    for row in sample:
+        if not isinstance(row, dict):
+            continue
+        columns.update(row.keys())
+        for value in row.values():
+            # Only short text values carry routing signal; skip numbers and JSON blobs
+            if isinstance(value, str) and len(value) <= 64:
+                terms.update(tokenize(value))
+
+    for column in columns:
+        for token in tokenize(column.replace("_", " ")):
+            terms[token] += _COLUMN_WEIGHT
+    return terms
+
+class TableRouter:
+    """
+    BM25 index over the chat catalog, built from table names, column names and
+    sample values. Routing a question is a few dictionary lookups, so it can
+    stand in for the LLM table-selection call whenever the match is confident.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, catalog):
+        self.tables = list(catalog)
+        self._postings = defaultdict(list)
+        lengths = {}
+        for table, rows in catalog.items():
+            terms = _table_terms(table, rows)
+            lengths[table] = sum(terms.values())
+            for term, frequency in terms.items():
+                self._postings[term].append((table, frequency))
+
+        count = len(self.tables) or 1
+        average_length = (sum(lengths.values()) / count) or 1
+        self._idf = {term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                     for term, postings in self._postings.items()}
+        self._norms = {table: self.k1 * (1 - self.b + self.b * length / average_length)
+                       for table, length in lengths.items()}
+
+    def score(self, query):
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for table, frequency in self._postings[term]:
+                scores[table] += idf * frequency * (self.k1 + 1) / (frequency + self._norms[table])
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def route(self, query, min_score=TABLE_ROUTER_MIN_SCORE, relative_cutoff=TABLE_ROUTER_RELATIVE_CUTOFF):
+        """
+        Return `(tables, confident)`. `tables` are the best matches in score
+        order; `confident` is False when nothing scored above `min_score`,
+        in which case the caller should fall back to the LLM.
+        """
+        ranked = self.score(query)
+        if not ranked or ranked[0][1] < min_score:
+            return [table for table, _ in ranked], False
+        best = ranked[0][1]
+        return [table for table, score in ranked if score >= best * relative_cutoff], True
@@ -0,0 +1,130 @@
+import os
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from data.balance_frame import RATIO_NAMES
+from data.processing import _parse_date
+from data.metrics import span
+
+# Periods covered by the rolling averages and volatilities
+TREND_WINDOW = int(os.environ.get("TREND_WINDOW", "4"))
+
+TOTAL_NAMES = ("total_asset", "total_liability", "total_equity", "net_income")
+# Growth compares each period with the one nearest to this far back, if one lies within the tolerance
+_LAGS = (
+    ("qoq", np.timedelta64(91, "D"), np.timedelta64(15, "D")),
+    ("yoy", np.timedelta64(365, "D"), np.timedelta64(31, "D")),
+)
+
+TREND_NAMES = (
+    tuple(f"{name}_{lag}" for lag, _, _ in _LAGS for name in TOTAL_NAMES)
+    + tuple(f"{name}_avg" for name in TOTAL_NAMES + RATIO_NAMES)
+    + tuple(f"{name}_volatility" for name in RATIO_NAMES)
+)
+
+def _lagged_growth(keys, values, start, offset, tolerance):
+    """
+    Growth of `values` (one row per series) at periods `start:` over the
+    period nearest to `offset` earlier; NaN where no earlier period lies
+    within `tolerance` of that date or the base is zero.
+    """
+    rows = np.arange(start, len(keys))
+    if not len(rows):
+        return np.empty((len(values), 0))
+    target = keys[rows] - offset
+    after = np.searchsorted(keys, target)
+    before = np.maximum(after - 1, 0)
+    after_clipped = np.minimum(after, len(keys) - 1)
+    use_before = (after >= len(keys)) | ((after > 0) & (target - keys[before] <= keys[after_clipped] - target))
+    lag = np.where(use_before, before, after_clipped)
+    valid = (lag < rows) & (np.abs(keys[lag] - target) <= tolerance)
+
+    base = values[:, lag]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (values[:, rows] - base) / np.abs(base)
+    growth[:, ~valid] = np.nan
+    growth[~np.isfinite(growth)] = np.nan
+    return growth
+
+def _rolling(values, start, window):
+    """Mean and sample standard deviation of the last `window` periods at periods `start:`, skipping gaps."""
+    if start >= values.shape[1]:
+        empty = np.empty((len(values), 0))
+        return empty, empty
+    first = max(start - window + 1, 0)
+    padding = np.full((len(values), window - 1 - (start - first)), np.nan)
+    windows = sliding_window_view(np.concatenate([padding, values[:, first:]], axis=1), window, axis=1)
+    finite = np.isfinite(windows)
+    count = finite.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(finite, windows, 0.0).sum(axis=-1) / count
+        deviation = np.where(finite, windows - mean[..., None], 0.0)
+        std = np.sqrt((deviation ** 2).sum(axis=-1) / (count - 1))
+    mean[count == 0] = np.nan
+    std[count < 2] = np.nan
+    return mean, std
+
+class TrendAnalytics:
+    """
+    Windowed metrics for every period of a date index, in date order:
+    `<total>_qoq` and `<total>_yoy` growth (as fractions) against the period
+    about a quarter and a year earlier, `<series>_avg` rolling means of the
+    totals and ratios, and `<ratio>_volatility` rolling standard deviations
+    of the ratios, each over the last `window` periods.
+
+    Passing the analytics of the previous snapshot recomputes only the
+    periods from the first one that was added or changed; the metrics of
+    earlier periods only look backwards, so they are copied as they are.
+    """
+
+    def __init__(self, date_index, previous=None, window=TREND_WINDOW):
+        self.date_index = date_index
+        self.window = window
+        self.keys = date_index.keys
+        sheets = date_index.sheets
+        positions = date_index.positions
+        columns = [getattr(sheets, name)[positions] for name in TOTAL_NAMES]
+        columns += [sheets.ratios[name][positions] for name in RATIO_NAMES]
+        # One row per input series, in date order
+        self.inputs = np.array(columns, dtype=np.float64).reshape(len(columns), len(positions))
+
+        start = self._first_change(previous)
+        with span("trend_analytics", mode="incremental" if start else "full"):
+            totals = self.inputs[:len(TOTAL_NAMES)]
+            growth = [_lagged_growth(self.keys, totals, start, offset, tolerance) for _, offset, tolerance in _LAGS]
+            mean, std = _rolling(self.inputs, start, window)
+            tail = np.concatenate(growth + [mean, std[len(TOTAL_NAMES):]], axis=0)
+            self.values = np.concatenate([previous.values[:, :start], tail], axis=1) if start else tail
+
+    def _first_change(self, previous):
+        if previous is None or previous.window != self.window:
+            return 0
+        common = min(len(previous.keys), len(self.keys))
+        old, new = previous.inputs[:, :common], self.inputs[:, :common]
+        same = previous.keys[:common] == self.keys[:common]
+        same &= ((old == new) | (np.isnan(old) & np.isnan(new))).all(axis=0)
+        changed = np.flatnonzero(~same)
+        return int(changed[0]) if len(changed) else common
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return self.inputs.nbytes + self.values.nbytes
+
+    def metric(self, name):
+        """The values of one metric in date order."""
+        return self.values[TREND_NAMES.index(name)]
+
+    def at(self, i):
+        """Metrics of the i-th period in date order, rounded, with gaps as None."""
+        return {name: None if value != value else round(value, 4)
+                for name, value in zip(TREND_NAMES, self.values[:, i].tolist())}
+
+    def for_date(self, date):
+        """Metrics of the period dated exactly `date`, or None."""
+        target = np.datetime64(_parse_date(date), "us")
+        i = int(np.searchsorted(self.keys, target))
+        if i < len(self.keys) and self.keys[i] == target:
+            return self.at(i)
+        return None
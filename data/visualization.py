@@ -11,6 +11,14 @@ def plot_financial_briefing(output_data):
     """
     Plots financial ratios and major financial statistics from balance sheet data
     and returns the plot as a base64-encoded string for use in web applications.
+    See render_financial_briefing for the expected input.
+    """
+    plot_data = base64.b64encode(render_financial_briefing(output_data)).decode('utf-8')
+    return f"data:image/png;base64,{plot_data}"
+
+def render_financial_briefing(output_data, fmt='png', highlight=None):
+    """
+    Renders the financial briefing figure and returns the encoded image bytes.
 
     Parameters:
     - output_data: List of dictionaries containing balance sheet data and ratios.
@@ -21,6 +29,8 @@ def plot_financial_briefing(output_data):
         - 'total_equity'
         - 'net_income'
         - 'ratios': Dictionary containing financial ratios
+    - fmt: Image format passed to savefig, e.g. 'png' or 'svg'
+    - highlight: Optional date (as in output_data) whose points are marked
     """
     # Extract data for plotting
     dates = [datetime.fromisoformat(item['date']) for item in output_data]
@@ -36,6 +46,13 @@ def plot_financial_briefing(output_data):
     debt_ratios = [item['ratios']['debt_ratio'] for item in output_data]
     net_profit_margins = [item['ratios']['net_profit_margin'] for item in output_data]
 
+    highlight_index = next((i for i, item in enumerate(output_data) if item['date'] == highlight), None)
+
+    def mark(ax, values):
+        if highlight_index is not None and values[highlight_index] is not None:
+            ax.plot([dates[highlight_index]], [values[highlight_index]], marker='o', markersize=12,
+                    color='#FF5733', markeredgecolor='white', zorder=3)
+
     # Plotting
     fig = plt.figure(figsize=(18, 22))
     gs = gridspec.GridSpec(4, 2, height_ratios=[1.5, 1, 1, 1])
@@ -46,6 +63,8 @@ def plot_financial_briefing(output_data):
     ax_major_stats.plot(dates, total_liabilities, label='Total Liabilities', marker='o')
     ax_major_stats.plot(dates, total_equities, label='Total Equities', marker='o')
     ax_major_stats.plot(dates, net_incomes, label='Net Income', marker='o')
+    for values in (total_assets, total_liabilities, total_equities, net_incomes):
+        mark(ax_major_stats, values)
     ax_major_stats.set_title('Major Financial Statistics')
     ax_major_stats.set_xlabel('Date')
     ax_major_stats.set_ylabel('Value (USD)')
@@ -81,6 +100,7 @@ def plot_financial_briefing(output_data):
 
     for ax, title, data in zip(axs, ratio_titles, ratio_data):
         ax.plot(dates, data, marker='o')
+        mark(ax, data)
         ax.set_title(title)
         ax.set_xlabel('Date')
         ax.set_ylabel('Ratio')
@@ -94,9 +114,6 @@ def plot_financial_briefing(output_data):
     plt.tight_layout()
 
     buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    plot_data = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    buffer.close()
+    fig.savefig(buffer, format=fmt)
     plt.close(fig)
-    return f"data:image/png;base64,{plot_data}"
+    return buffer.getvalue()
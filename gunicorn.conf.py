@@ -0,0 +1,22 @@
+# Production server settings, tuned for a single shared-CPU Fly machine.
+# Run with: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+
+# One process keeps a single copy of the in-memory caches on the 1 GB VM;
+# requests overlap on threads since they mostly wait on Supabase and OpenAI.
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "48"))
+
+# Streamed analyses can run for a couple of minutes
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = 30
+keepalive = 5
+
+# Caches and refresh threads are created per worker, so don't preload before forking
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
@@ -22,6 +22,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream'
                 },
                 body: JSON.stringify({ query: userQuery })
             });
@@ -30,12 +31,28 @@ document.addEventListener('DOMContentLoaded', function() {
                 throw new Error('Network response was not ok');
             }
 
-            const data = await response.json();
-
-            // Display chatbot response
+            // Display chatbot response, filling it in as tokens stream in
             const botMessage = document.createElement('div');
-            botMessage.textContent = `Reflash: ${data.response}`;
+            botMessage.textContent = 'Reflash: ';
             chatMessages.appendChild(botMessage);
+
+            if (!(response.headers.get('Content-Type') || '').includes('text/event-stream')) {
+                const data = await response.json();
+                botMessage.textContent = `Reflash: ${data.response}`;
+                return;
+            }
+
+            let responseText = '';
+            await readEventStream(response, (eventName, data) => {
+                if (eventName === 'error') {
+                    throw new Error(data.error || 'Streaming failed');
+                }
+                if (data.token) {
+                    responseText += data.token;
+                    botMessage.textContent = `Reflash: ${responseText}`;
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                }
+            });
         } catch (error) {
             console.error('Error fetching chat response:', error);
             const errorMessage = document.createElement('div');
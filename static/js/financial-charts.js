@@ -1,33 +1,38 @@
 document.addEventListener('DOMContentLoaded', function() {
-    // Parse dates and prepare datasets
-    const dates = financialData.map(item => new Date(item.date));
-    
-    // Major financial stats data
-    const totalAssets = financialData.map(item => item.total_asset);
-    const totalLiabilities = financialData.map(item => item.total_liability);
-    const totalEquities = financialData.map(item => item.total_equity);
-    const netIncomes = financialData.map(item => item.net_income);
-    
-    // Financial ratios data
-    const currentRatios = financialData.map(item => item.ratios.current_ratio);
-    const debtToEquityRatios = financialData.map(item => item.ratios.debt_to_equity_ratio);
-    const returnOnEquities = financialData.map(item => item.ratios.return_on_equity);
-    const equityMultipliers = financialData.map(item => item.ratios.equity_multiplier);
-    const debtRatios = financialData.map(item => item.ratios.debt_ratio);
-    const netProfitMargins = financialData.map(item => item.ratios.net_profit_margin);
+    // Chart series are fetched once, downsampled on the server, instead of being inlined in the page
+    const selectedDateObj = selectedDate ? new Date(selectedDate) : null;
     
     // Store chart instances
     const chartInstances = {};
     
-    // Find the selected date index to highlight the data point
-    let selectedDateIndex = -1;
+    // A line chart can't show more than about one point per pixel
+    const chartWidth = document.querySelector('.carousel-container').clientWidth * (window.devicePixelRatio || 1);
+    const params = new URLSearchParams({ points: Math.max(100, Math.min(2000, Math.round(chartWidth))) });
     if (selectedDate) {
-        const selectedDateObj = new Date(selectedDate);
-        selectedDateIndex = dates.findIndex(date => 
-            date.getFullYear() === selectedDateObj.getFullYear() && 
-            date.getMonth() === selectedDateObj.getMonth() && 
-            date.getDate() === selectedDateObj.getDate()
-        );
+        params.set('highlight', selectedDate);
+    }
+    const seriesRequest = fetch(`${seriesUrl}?${params}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`Failed to load chart data (${response.status})`);
+            }
+            return response.json();
+        })
+        .then(body => body.series);
+    
+    function toPoints(series) {
+        return series.dates.map((date, i) => ({ x: new Date(date), y: series.values[i] }));
+    }
+    
+    // Highlight the data point on the selected date
+    function isSelected(context) {
+        const point = context.raw;
+        if (!selectedDateObj || !point) {
+            return false;
+        }
+        return point.x.getFullYear() === selectedDateObj.getFullYear() && 
+            point.x.getMonth() === selectedDateObj.getMonth() && 
+            point.x.getDate() === selectedDateObj.getDate();
     }
     
     // Chart configuration options
@@ -80,31 +85,27 @@ document.addEventListener('DOMContentLoaded', function() {
             point: {
                 radius: (context) => {
                     // Return larger radius for the selected date point
-                    const index = context.dataIndex;
-                    return index === selectedDateIndex ? 8 : 3;
+                    return isSelected(context) ? 8 : 3;
                 },
                 hoverRadius: 7,
                 backgroundColor: (context) => {
                     // Highlight the selected date point
-                    const index = context.dataIndex;
-                    return index === selectedDateIndex ? '#FF5733' : context.dataset.borderColor;
+                    return isSelected(context) ? '#FF5733' : context.dataset.borderColor;
                 },
                 borderWidth: (context) => {
                     // Add border to the selected date point
-                    const index = context.dataIndex;
-                    return index === selectedDateIndex ? 2 : 1;
+                    return isSelected(context) ? 2 : 1;
                 },
                 borderColor: (context) => {
                     // White border on the selected point for contrast
-                    const index = context.dataIndex;
-                    return index === selectedDateIndex ? 'white' : context.dataset.borderColor;
+                    return isSelected(context) ? 'white' : context.dataset.borderColor;
                 }
             }
         }
     };
     
     // Function to create major financial stats chart
-    function createMajorFinancialStatsChart() {
+    function createMajorFinancialStatsChart(series) {
         if (chartInstances['majorFinancialStats']) {
             chartInstances['majorFinancialStats'].destroy();
         }
@@ -112,43 +113,42 @@ document.addEventListener('DOMContentLoaded', function() {
         chartInstances['majorFinancialStats'] = new Chart(document.getElementById('majorFinancialStats'), {
             type: 'line',
             data: {
-                labels: dates,
                 datasets: [
                     {
                         label: 'Total Assets',
-                        data: totalAssets,
+                        data: toPoints(series.total_asset),
                         borderColor: 'rgb(75, 192, 192)',
                         tension: 0.1,
-                        pointRadius: (ctx) => ctx.dataIndex === selectedDateIndex ? 8 : 3,
+                        pointRadius: (ctx) => isSelected(ctx) ? 8 : 3,
                         pointHoverRadius: 7,
-                        pointBackgroundColor: (ctx) => ctx.dataIndex === selectedDateIndex ? '#FF5733' : 'rgb(75, 192, 192)'
+                        pointBackgroundColor: (ctx) => isSelected(ctx) ? '#FF5733' : 'rgb(75, 192, 192)'
                     },
                     {
                         label: 'Total Liabilities',
-                        data: totalLiabilities,
+                        data: toPoints(series.total_liability),
                         borderColor: 'rgb(255, 99, 132)',
                         tension: 0.1,
-                        pointRadius: (ctx) => ctx.dataIndex === selectedDateIndex ? 8 : 3,
+                        pointRadius: (ctx) => isSelected(ctx) ? 8 : 3,
                         pointHoverRadius: 7,
-                        pointBackgroundColor: (ctx) => ctx.dataIndex === selectedDateIndex ? '#FF5733' : 'rgb(255, 99, 132)'
+                        pointBackgroundColor: (ctx) => isSelected(ctx) ? '#FF5733' : 'rgb(255, 99, 132)'
                     },
                     {
                         label: 'Total Equity',
-                        data: totalEquities,
+                        data: toPoints(series.total_equity),
                         borderColor: 'rgb(153, 102, 255)',
                         tension: 0.1,
-                        pointRadius: (ctx) => ctx.dataIndex === selectedDateIndex ? 8 : 3,
+                        pointRadius: (ctx) => isSelected(ctx) ? 8 : 3,
                         pointHoverRadius: 7,
-                        pointBackgroundColor: (ctx) => ctx.dataIndex === selectedDateIndex ? '#FF5733' : 'rgb(153, 102, 255)'
+                        pointBackgroundColor: (ctx) => isSelected(ctx) ? '#FF5733' : 'rgb(153, 102, 255)'
                     },
                     {
                         label: 'Net Income',
-                        data: netIncomes,
+                        data: toPoints(series.net_income),
                         borderColor: 'rgb(255, 159, 64)',
                         tension: 0.1,
-                        pointRadius: (ctx) => ctx.dataIndex === selectedDateIndex ? 8 : 3,
+                        pointRadius: (ctx) => isSelected(ctx) ? 8 : 3,
                         pointHoverRadius: 7,
-                        pointBackgroundColor: (ctx) => ctx.dataIndex === selectedDateIndex ? '#FF5733' : 'rgb(255, 159, 64)'
+                        pointBackgroundColor: (ctx) => isSelected(ctx) ? '#FF5733' : 'rgb(255, 159, 64)'
                     }
                 ]
             },
@@ -188,7 +188,6 @@ document.addEventListener('DOMContentLoaded', function() {
         chartInstances[canvasId] = new Chart(document.getElementById(canvasId), {
             type: 'line',
             data: {
-                labels: dates,
                 datasets: [{
                     label: title,
                     data: data,
@@ -196,9 +195,9 @@ document.addEventListener('DOMContentLoaded', function() {
                     backgroundColor: backgroundColor,
                     fill: true,
                     tension: 0.1,
-                    pointRadius: (ctx) => ctx.dataIndex === selectedDateIndex ? 8 : 3,
+                    pointRadius: (ctx) => isSelected(ctx) ? 8 : 3,
                     pointHoverRadius: 7,
-                    pointBackgroundColor: (ctx) => ctx.dataIndex === selectedDateIndex ? '#FF5733' : color
+                    pointBackgroundColor: (ctx) => isSelected(ctx) ? '#FF5733' : color
                 }]
             },
             options: {
@@ -224,13 +223,13 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Mapping of slide index to chart creation function
     const chartCreators = [
-        () => createMajorFinancialStatsChart(),
-        () => createRatioChart('currentRatio', 'Current Ratio', currentRatios, 'rgb(54, 162, 235)'),
-        () => createRatioChart('debtToEquityRatio', 'Debt to Equity Ratio', debtToEquityRatios, 'rgb(255, 99, 132)'),
-        () => createRatioChart('returnOnEquity', 'Return on Equity', returnOnEquities, 'rgb(75, 192, 192)'),
-        () => createRatioChart('equityMultiplier', 'Equity Multiplier', equityMultipliers, 'rgb(153, 102, 255)'),
-        () => createRatioChart('debtRatio', 'Debt Ratio', debtRatios, 'rgb(255, 159, 64)'),
-        () => createRatioChart('netProfitMargin', 'Net Profit Margin', netProfitMargins, 'rgb(255, 205, 86)')
+        (series) => createMajorFinancialStatsChart(series),
+        (series) => createRatioChart('currentRatio', 'Current Ratio', toPoints(series.current_ratio), 'rgb(54, 162, 235)'),
+        (series) => createRatioChart('debtToEquityRatio', 'Debt to Equity Ratio', toPoints(series.debt_to_equity_ratio), 'rgb(255, 99, 132)'),
+        (series) => createRatioChart('returnOnEquity', 'Return on Equity', toPoints(series.return_on_equity), 'rgb(75, 192, 192)'),
+        (series) => createRatioChart('equityMultiplier', 'Equity Multiplier', toPoints(series.equity_multiplier), 'rgb(153, 102, 255)'),
+        (series) => createRatioChart('debtRatio', 'Debt Ratio', toPoints(series.debt_ratio), 'rgb(255, 159, 64)'),
+        (series) => createRatioChart('netProfitMargin', 'Net Profit Margin', toPoints(series.net_profit_margin), 'rgb(255, 205, 86)')
     ];
     
     // Carousel functionality
@@ -259,9 +258,11 @@ document.addEventListener('DOMContentLoaded', function() {
             // Initialize chart if not already done
             if (!chartsInitialized[index]) {
                 // Small delay to ensure the canvas is visible
+                chartsInitialized[index] = true;
                 setTimeout(() => {
-                    chartCreators[index]();
-                    chartsInitialized[index] = true;
+                    seriesRequest
+                        .then(series => chartCreators[index](series))
+                        .catch(error => console.error('Error loading chart data:', error));
                 }, 50);
             }
             